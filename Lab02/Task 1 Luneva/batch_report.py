@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import time
+import matplotlib
+matplotlib.use('Agg') # без окон, только запись в файл
+import cv2
+import numpy as np
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from task1 import grayscale_fixed, picture, histogram, title1, title2
+from histograms import compute_histogram
+
+'''
+Пакетный отчёт по папке изображений без открытия окон.
+Для каждого изображения: два серых варианта, их разность, гистограммы серых
+и гистограммы каналов R, G, B. Результат - картинка <имя>.png и статистика <имя>.json.
+
+Файлы раздаются процессам пула по одному: пока один процесс считает и рисует
+своё изображение, другие уже декодируют следующие, так что чтение файлов
+идёт параллельно с вычислениями.
+
+Запуск:
+    python batch_report.py photos/ -o reports/ [-j 4]
+'''
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+
+def gray_stats(gray, hist):
+    return {
+        'mean': float(hist.mean()[0]),
+        'std': float(gray.std()),
+        'min': int(gray.min()),
+        'max': int(gray.max()),
+        'histogram': hist.counts[0].tolist(),
+    }
+
+
+def make_report(path, output_dir):
+    # каждый процесс пула работает в один поток, параллельность - за счёт процессов
+    cv2.setNumThreads(1)
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Не удалось прочитать {path}")
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    gray1, gray2 = grayscale_fixed(image)
+    difference = cv2.absdiff(gray1, gray2)
+    hist1, hist2 = compute_histogram(gray1), compute_histogram(gray2)
+    channel_hist = compute_histogram(image)
+
+    stats = {
+        'file': os.path.basename(path),
+        'width': image.shape[1],
+        'height': image.shape[0],
+        'gray1': gray_stats(gray1, hist1),
+        'gray2': gray_stats(gray2, hist2),
+        'difference': {
+            'mean': float(difference.mean()),
+            'max': int(difference.max()),
+            'nonzero_fraction': float(np.count_nonzero(difference) / difference.size),
+            'energy': float(np.square(difference, dtype=np.float64).sum()),
+        },
+        'channels': {
+            name: {'mean': float(mean), 'histogram': counts.tolist()}
+            for name, mean, counts in zip('RGB', channel_hist.mean(), channel_hist.counts)
+        },
+    }
+
+    # та же раскладка, что и в task1, но в шестом секторе - гистограммы каналов
+    plt.figure(figsize=(15, 10))
+    picture(gray1, title1, 1, 'gray')
+    picture(gray2, title2, 2, 'gray')
+    picture(difference, 'Разность изображений', 3, 'gray')
+    histogram(hist1.counts[0], title1, 4)
+    histogram(hist2.counts[0], title2, 5)
+    plt.subplot(2, 3, 6)
+    for counts, color in zip(channel_hist.counts, 'rgb'):
+        plt.plot(counts, color=color)
+    plt.xlim([0, 256])
+    plt.title('Гистограммы каналов RGB')
+    plt.tight_layout()
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    plt.savefig(os.path.join(output_dir, stem + '.png'), dpi=80)
+    plt.close()
+    with open(os.path.join(output_dir, stem + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный отчёт: оттенки серого и каналы")
+    parser.add_argument('source', help="папка с изображениями")
+    parser.add_argument('-o', '--output', required=True, help="папка для отчётов")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.source, name) for name in os.listdir(args.source)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(args.workers) as pool:
+        futures = [pool.submit(make_report, path, args.output) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                stats = future.result()
+                print(f"{path}: {stats['width']}x{stats['height']}, "
+                      f"средняя разность {stats['difference']['mean']:.2f}")
+            except Exception as e:
+                failed += 1
+                print(f"{path}: Error: {e}")
+    done = len(paths) - failed
+    print(f"Готово: {done} из {len(paths)} изображений за {time.perf_counter() - start:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
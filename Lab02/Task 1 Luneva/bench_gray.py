@@ -0,0 +1,57 @@
+import time
+import tracemalloc
+import numpy as np
+from task1 import grayscale, grayscale_fixed
+
+'''
+Сравнение grayscale (float64) и grayscale_fixed (целые числа).
+1) Перебираем все 2^24 цвета и считаем, где результаты расходятся.
+2) Меряем время и пиковую память (tracemalloc видит выделения NumPy) на 1, 12 и 24 Мп.
+'''
+
+SIZES = {
+    '1 Мп': (1000, 1000),
+    '12 Мп': (3000, 4000),
+    '24 Мп': (4000, 6000),
+}
+
+
+def all_colors():
+    codes = np.arange(1 << 24, dtype=np.uint32)
+    colors = np.empty((4096, 4096, 3), dtype=np.uint8)
+    colors[..., 0] = (codes >> 16).reshape(4096, 4096)
+    colors[..., 1] = ((codes >> 8) & 255).reshape(4096, 4096)
+    colors[..., 2] = (codes & 255).reshape(4096, 4096)
+    return colors
+
+
+def measure(function, image):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(image)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    colors = all_colors()
+    names = ('0.299/0.587/0.114', '0.2126/0.7152/0.0722')
+    for name, reference, fixed in zip(names, grayscale(colors), grayscale_fixed(colors)):
+        diff = fixed.astype(np.int16) - reference
+        print(f"{name}: отличается {np.count_nonzero(diff)} из {diff.size} цветов, "
+              f"отличие от {diff.min()} до {diff.max()}")
+
+    print(f"{'размер':>8} {'float, с':>9} {'int, с':>8} {'ускорение':>10} {'float, МБ':>10} {'int, МБ':>8}")
+    rng = np.random.default_rng(0)
+    for name, (height, width) in SIZES.items():
+        image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        float_time, float_peak = measure(grayscale, image)
+        fixed_time, fixed_peak = measure(grayscale_fixed, image)
+        print(f"{name:>8} {float_time:>9.3f} {fixed_time:>8.3f} {float_time / fixed_time:>9.1f}x "
+              f"{float_peak / 1e6:>10.0f} {fixed_peak / 1e6:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import sys
+import cv2
+import numpy as np
+from task1 import grayscale_fixed
+
+'''
+Потоковое преобразование в оттенки серого для очень больших изображений.
+Изображение читается полосами по strip_rows строк, для каждой полосы считаются
+оба серых варианта (целочисленным grayscale_fixed) и их разность, и полосы
+сразу дописываются в три файла PGM.
+Так в памяти одновременно находится только одна полоса.
+
+Без распаковки всего изображения полосами можно читать только несжатые форматы:
+BMP (24 бита) и PPM (P6) - они отображаются в память через np.memmap.
+Остальные форматы (JPEG, PNG, ...) cv2 умеет читать только целиком,
+поэтому для них исходник загружается полностью, а по полосам идёт только обработка.
+
+Запуск:
+    python gray_stream.py scan.bmp scan_out [strip_rows]
+Результат: scan_out_gray1.pgm, scan_out_gray2.pgm, scan_out_diff.pgm
+'''
+
+STRIP_ROWS = 256
+
+
+def _read_ppm_header(f):
+    # заголовок PPM: P6, ширина, высота, максимум; между ними пробелы и комментарии #
+    tokens = []
+    while len(tokens) < 4:
+        line = f.readline()
+        if not line:
+            raise ValueError("Обрезанный заголовок PPM")
+        tokens += line.split(b'#')[0].split()
+    if tokens[0] != b'P6' or int(tokens[3]) != 255:
+        raise ValueError("Поддерживается только PPM P6 с 8 битами на канал")
+    return int(tokens[1]), int(tokens[2]), f.tell()
+
+
+def map_ppm(path):
+    with open(path, 'rb') as f:
+        width, height, offset = _read_ppm_header(f)
+    return np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(height, width, 3))
+
+
+def map_bmp(path):
+    with open(path, 'rb') as f:
+        header = f.read(54)
+    offset = int.from_bytes(header[10:14], 'little')
+    width = int.from_bytes(header[18:22], 'little', signed=True)
+    height = int.from_bytes(header[22:26], 'little', signed=True)
+    bits = int.from_bytes(header[28:30], 'little')
+    compression = int.from_bytes(header[30:34], 'little')
+    if bits != 24 or compression != 0:
+        raise ValueError("Поддерживается только несжатый 24-битный BMP")
+
+    # строки выровнены до 4 байт и (при положительной высоте) идут снизу вверх, порядок каналов BGR
+    row_size = (width * 3 + 3) // 4 * 4
+    rows = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(abs(height), row_size))
+    bgr = rows[:, :width * 3].reshape(abs(height), width, 3)
+    if height > 0:
+        bgr = bgr[::-1]
+    return bgr[:, :, ::-1]
+
+
+def open_image(path):
+    '''
+    Возвращает (массив формы (h, w, 3), bgr): для BMP/PPM - отображение файла в память
+    в порядке RGB, для остальных форматов - полностью загруженное изображение cv2 как есть,
+    в порядке BGR (bgr = True). Каналы переставляются по полосам в rgb_strip,
+    без полной копии изображения.
+    '''
+    lower = path.lower()
+    if lower.endswith('.ppm'):
+        return map_ppm(path), False
+    if lower.endswith('.bmp'):
+        try:
+            return map_bmp(path), False
+        except ValueError:
+            pass
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Не удалось прочитать {path}")
+    return image, True
+
+
+# копия полосы строк [y0, y1) в порядке RGB
+def rgb_strip(pixels, bgr, y0, y1):
+    strip = pixels[y0:y1]
+    return np.ascontiguousarray(strip[..., ::-1] if bgr else strip)
+
+
+class PGMWriter:
+    '''
+    Серое изображение в формате PGM (P5), строки дописываются по мере готовности.
+    '''
+    def __init__(self, path, width, height):
+        self.file = open(path, 'wb')
+        self.file.write(f'P5\n{width} {height}\n255\n'.encode())
+
+    def write_rows(self, rows):
+        self.file.write(np.ascontiguousarray(rows, dtype=np.uint8).tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+def grayscale_stream(path, out_prefix, strip_rows=STRIP_ROWS):
+    pixels, bgr = open_image(path)
+    height, width = pixels.shape[:2]
+
+    writers = [PGMWriter(f'{out_prefix}_{name}.pgm', width, height) for name in ('gray1', 'gray2', 'diff')]
+    try:
+        for y0 in range(0, height, strip_rows):
+            # копия только одной полосы из отображения файла
+            strip = rgb_strip(pixels, bgr, y0, y0 + strip_rows)
+            gray1, gray2 = grayscale_fixed(strip)
+            for writer, rows in zip(writers, (gray1, gray2, cv2.absdiff(gray1, gray2))):
+                writer.write_rows(rows)
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Использование: python gray_stream.py <изображение> <префикс результата> [строк в полосе]")
+        sys.exit(1)
+    grayscale_stream(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else STRIP_ROWS)
@@ -0,0 +1,65 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+'''
+Гистограммы интенсивности через np.bincount.
+Все каналы изображения считаются за один проход: к значению канала c
+прибавляем c * 256, и одна гистограмма на 256 * каналов столбиков
+сразу содержит все канальные гистограммы.
+Результаты частичные и складываются: гистограммы полос, кадров или
+разных файлов можно объединять через + / merge.
+Рисование только отображает уже посчитанные значения.
+'''
+
+CHUNK_ROWS = 256 # bincount переводит значения в intp (8 байт), поэтому идём полосами
+BINS = 256
+
+
+class Histogram:
+    def __init__(self, counts):
+        self.counts = counts # массив int64 формы (каналы, 256)
+
+    @classmethod
+    def empty(cls, channels=1):
+        return cls(np.zeros((channels, BINS), dtype=np.int64))
+
+    @property
+    def channels(self):
+        return self.counts.shape[0]
+
+    def __add__(self, other):
+        return Histogram(self.counts + other.counts)
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def total(self):
+        return self.counts.sum(axis=1)
+
+    def mean(self):
+        return self.counts @ np.arange(BINS) / np.maximum(self.total(), 1)
+
+
+def compute_histogram(image, chunk_rows=CHUNK_ROWS):
+    '''
+    image - массив uint8: (h, w) для одного канала или (h, w, c) для нескольких.
+    Возвращает Histogram с c строками.
+    '''
+    if image.ndim == 2:
+        image = image[:, :, np.newaxis]
+    channels = image.shape[2]
+    offsets = np.arange(channels, dtype=np.uint16) * BINS
+
+    counts = np.zeros(channels * BINS, dtype=np.int64)
+    for y0 in range(0, image.shape[0], chunk_rows):
+        indices = image[y0:y0 + chunk_rows].astype(np.uint16)
+        indices += offsets
+        counts += np.bincount(indices.ravel(), minlength=channels * BINS)
+    return Histogram(counts.reshape(channels, BINS))
+
+
+def plot_counts(counts, color='green', alpha=0.7):
+    # рисуем готовые значения столбиками, без пересчёта по пикселям
+    plt.bar(np.arange(BINS), counts, width=1, align='edge', color=color, alpha=alpha)
+    plt.xlim([0, BINS])
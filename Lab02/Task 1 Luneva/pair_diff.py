@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from task1 import grayscale_fixed
+from gray_stream import open_image, rgb_strip
+
+'''
+Сравнение пар изображений по плиткам для контроля качества.
+Вместо полноразмерной картинки |a - b| для каждой плитки tile x tile
+считается гистограмма разности (256 значений), а из неё - максимум,
+среднее и перцентиль. На выходе JSON со статистикой и тепловая карта,
+где одна плитка = один пиксель.
+
+Изображения переводятся в серый по первой формуле (0.299 R + 0.587 G + 0.114 B).
+Одна пара обрабатывается полосами плиток в потоках (NumPy и cv2 отпускают GIL),
+две папки - парами файлов с одинаковыми именами в пуле процессов.
+BMP и PPM отображаются в память (см. gray_stream), так что в памяти только полосы.
+
+Запуск:
+    python pair_diff.py a.png b.png -o qa/
+    python pair_diff.py dir_a/ dir_b/ -o qa/ --tile 128 --percentile 99.9
+'''
+
+TILE = 256
+PERCENTILE = 99.0
+
+
+def strip_tile_histograms(image_a, image_b, y0, tile):
+    '''
+    Гистограммы разности для полосы плиток, начинающейся со строки y0:
+    массив формы (плиток в ряду, 256). image_a, image_b - пары (массив, bgr) из open_image.
+    '''
+    gray_a = grayscale_fixed(rgb_strip(*image_a, y0, y0 + tile), formulas=(0,))[0]
+    gray_b = grayscale_fixed(rgb_strip(*image_b, y0, y0 + tile), formulas=(0,))[0]
+    diff = cv2.absdiff(gray_a, gray_b)
+
+    width = diff.shape[1]
+    columns = (width + tile - 1) // tile
+    # номер столбика = номер плитки в ряду * 256 + значение разности
+    offsets = (np.arange(width, dtype=np.int64) // tile) * 256
+    indices = diff + offsets
+    return np.bincount(indices.ravel(), minlength=columns * 256).reshape(columns, 256)
+
+
+def stats_from_histograms(hist, percentile):
+    '''
+    hist - (..., 256). Возвращает максимум, среднее и перцентиль по последней оси.
+    '''
+    values = np.arange(256)
+    count = hist.sum(axis=-1)
+    mean = hist @ values / np.maximum(count, 1)
+    maximum = 255 - np.argmax(hist[..., ::-1] > 0, axis=-1)
+    cumulative = np.cumsum(hist, axis=-1)
+    high = np.argmax(cumulative >= (percentile / 100 * count)[..., np.newaxis], axis=-1)
+    return maximum, mean, high
+
+
+def compare_pair(path_a, path_b, output_dir, tile=TILE, percentile=PERCENTILE, threads=None):
+    image_a, image_b = open_image(path_a), open_image(path_b)
+    shape_a, shape_b = image_a[0].shape, image_b[0].shape
+    if shape_a != shape_b:
+        raise ValueError(f"Разные размеры: {shape_a[:2]} и {shape_b[:2]}")
+    height = shape_a[0]
+
+    with ThreadPoolExecutor(threads) as pool:
+        rows = list(pool.map(lambda y0: strip_tile_histograms(image_a, image_b, y0, tile), range(0, height, tile)))
+    hist = np.stack(rows) # (ряды плиток, плитки в ряду, 256)
+
+    maximum, mean, high = stats_from_histograms(hist, percentile)
+    total_max, total_mean, total_high = stats_from_histograms(hist.sum(axis=(0, 1)), percentile)
+
+    stem = os.path.splitext(os.path.basename(path_a))[0]
+    # тепловая карта по максимуму разности в плитке
+    heat = cv2.applyColorMap(maximum.astype(np.uint8), cv2.COLORMAP_INFERNO)
+    cv2.imwrite(os.path.join(output_dir, stem + '_heatmap.png'), heat)
+
+    report = {
+        'a': path_a,
+        'b': path_b,
+        'tile': tile,
+        'percentile': percentile,
+        'max': int(total_max),
+        'mean': float(total_mean),
+        'high': int(total_high),
+        'tiles': {
+            'max': maximum.tolist(),
+            'mean': np.round(mean, 3).tolist(),
+            'high': high.tolist(),
+        },
+    }
+    with open(os.path.join(output_dir, stem + '_diff.json'), 'w') as f:
+        json.dump(report, f)
+    return report
+
+
+def _compare_pair_safe(args):
+    try:
+        return compare_pair(*args), None
+    except Exception as e:
+        return None, e
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поплиточное сравнение пар изображений")
+    parser.add_argument('a', help="изображение или папка")
+    parser.add_argument('b', help="изображение или папка")
+    parser.add_argument('-o', '--output', required=True, help="папка для отчётов и тепловых карт")
+    parser.add_argument('--tile', type=int, default=TILE)
+    parser.add_argument('--percentile', type=float, default=PERCENTILE)
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args()
+    os.makedirs(args.output, exist_ok=True)
+
+    if os.path.isdir(args.a):
+        names = sorted(set(os.listdir(args.a)) & set(os.listdir(args.b)))
+        jobs = [(os.path.join(args.a, name), os.path.join(args.b, name), args.output, args.tile, args.percentile, 1)
+                for name in names]
+        with ProcessPoolExecutor(args.workers) as pool:
+            results = list(pool.map(_compare_pair_safe, jobs))
+    else:
+        results = [_compare_pair_safe((args.a, args.b, args.output, args.tile, args.percentile, args.workers))]
+
+    for report, error in results:
+        if error is not None:
+            print(f"Error: {error}")
+        else:
+            print(f"{report['a']}: max {report['max']}, mean {report['mean']:.3f}, "
+                  f"p{report['percentile']:g} {report['high']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
+from histograms import compute_histogram, plot_counts
 
 '''
 Задание:
@@ -30,6 +31,44 @@ def grayscale(image):
     
     return gray1, gray2
 
+# веса (R, G, B) и делитель для формул 1 и 2
+FORMULAS = ((299, 587, 114, 1000), (2126, 7152, 722, 10000))
+
+'''
+То же самое в целых числах, без float64 (24 байта временных массивов на пиксель у grayscale).
+Веса записываем точными дробями: 0.299 R + 0.587 G + 0.114 B = (299 R + 587 G + 114 B) / 1000,
+0.2126 R + 0.7152 G + 0.0722 B = (2126 R + 7152 G + 722 B) / 10000.
+Округление вниз (целочисленное деление), как .astype(np.uint8) в grayscale.
+Результат совпадает с grayscale везде, кроме цветов, где точная сумма - целое число,
+а float64 из-за ошибки округления получает чуть меньше (например, белый по второй формуле
+даёт 254 вместо 255). Там целочисленный вариант на 1 больше (около 0.02% всех цветов).
+Обе формулы считаются за один проход по полосам из chunk_rows строк, поэтому временные
+массивы uint32 занимают только размер полосы.
+formulas - какие формулы считать (номера в FORMULAS), по умолчанию обе;
+возвращается кортеж изображений в том же порядке.
+'''
+
+def grayscale_fixed(image, chunk_rows=64, formulas=(0, 1)):
+    height, width = image.shape[:2]
+    grays = tuple(np.empty((height, width), dtype=np.uint8) for _ in formulas)
+
+    for y0 in range(0, height, chunk_rows):
+        y1 = min(y0 + chunk_rows, height)
+        r = image[y0:y1, :, 0].astype(np.uint32)
+        g = image[y0:y1, :, 1].astype(np.uint32)
+        b = image[y0:y1, :, 2].astype(np.uint32)
+
+        for gray, formula in zip(grays, formulas):
+            weight_r, weight_g, weight_b, divisor = FORMULAS[formula]
+            # максимум 255 * 10000, в uint32 помещается
+            acc = r * weight_r
+            acc += g * weight_g
+            acc += b * weight_b
+            acc //= divisor
+            gray[y0:y1] = acc
+
+    return grays
+
 '''
 выводим изображение image с заголовком title (чаще всего это формула).
 n - номер сектора, где располагается изображение,
@@ -44,15 +83,15 @@ def picture(image, title, n, cmap = 'viridis'):
     plt.tight_layout()
     
 '''
-рисуем гистограмму частот интенсивностей для изображения image.
+рисуем гистограмму частот интенсивностей.
+counts - уже посчитанные частоты для 256 значений (см. histograms.compute_histogram),
 title - заголовок 
 n - номер сектора, где располагается гистограмма
 '''
-def histogram(image, title, n):
+def histogram(counts, title, n):
     plt.subplot(2, 3, n) # расположение на экране
-    # строим гистограмму из 256 столбиков
-    # image.ravel() - преобразует многомерный массив (изображение) в одномерный массив
-    plt.hist(image.ravel(), bins=256, range=[0, 256], color='green', alpha=0.7) 
+    # рисуем готовые 256 столбиков, изображение заново не просматриваем
+    plot_counts(counts, color='green', alpha=0.7)
     plt.title(title)
     plt.xlabel('Интенсивность')
     plt.ylabel('Частота')
@@ -60,38 +99,41 @@ def histogram(image, title, n):
     plt.tight_layout()
 
 
-    
+# заголовки для изображений и гистограмм по каждой формуле
+title1 = 'Формула 0.299 R + 0.587 G + 0.114 B'
+title2 = 'Формула 0.2126 R + 0.7152 G + 0.0722 B'
 
-# считываем изображение.
-# Нам нужно, чтобы изображение было в формате RGB, но imread считывает его в формате BGR.
-# поэтому добавляем преобразование из BGR в RGB.
-image = cv2.cvtColor(cv2.imread('dogs.jpg'), cv2.COLOR_BGR2RGB)
 
-gray1, gray2 = grayscale(image) # получаем из исходного 2 изображения в оттенках серого
+def main():
+    # считываем изображение.
+    # Нам нужно, чтобы изображение было в формате RGB, но imread считывает его в формате BGR.
+    # поэтому добавляем преобразование из BGR в RGB.
+    image = cv2.cvtColor(cv2.imread('dogs.jpg'), cv2.COLOR_BGR2RGB)
 
-# находим разность серых изображений.
-# absdiff для каждого пикселя вычисляет модуль разности между одним изображением и другим
-difference = cv2.absdiff(gray1, gray2) 
+    gray1, gray2 = grayscale_fixed(image) # получаем из исходного 2 изображения в оттенках серого
 
+    # находим разность серых изображений.
+    # absdiff для каждого пикселя вычисляет модуль разности между одним изображением и другим
+    difference = cv2.absdiff(gray1, gray2) 
 
-# дальше - демонстрация всех картинок и гистграмм.
-# первый ряд: серое изображение полученное по первой формуле, потом по втрой формуле и разность этих изображений
-# второй ряд: гистграмма интенсивности для первого серого изображения, потом для второго и исходное изображение
 
-title1 = 'Формула 0.299 R + 0.587 G + 0.114 B'
-title2 = 'Формула 0.2126 R + 0.7152 G + 0.0722 B'
+    # дальше - демонстрация всех картинок и гистграмм.
+    # первый ряд: серое изображение полученное по первой формуле, потом по втрой формуле и разность этих изображений
+    # второй ряд: гистграмма интенсивности для первого серого изображения, потом для второго и исходное изображение
 
-plt.figure(figsize=(15, 10))
+    plt.figure(figsize=(15, 10))
 
-picture(gray1, title1, 1, 'gray')
-picture(gray2, title2, 2, 'gray')
-picture(difference, 'Разность изображений', 3, 'gray')
+    picture(gray1, title1, 1, 'gray')
+    picture(gray2, title2, 2, 'gray')
+    picture(difference, 'Разность изображений', 3, 'gray')
 
-histogram(gray1, title1, 4)
-histogram(gray2, title2, 5)
+    histogram(compute_histogram(gray1).counts[0], title1, 4)
+    histogram(compute_histogram(gray2).counts[0], title2, 5)
 
-picture(image, 'Исходное RGB изображение', 6)
+    picture(image, 'Исходное RGB изображение', 6)
 
-plt.show()
+    plt.show()
 
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import csv
+import queue
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+from task1 import grayscale_fixed
+from histograms import Histogram, compute_histogram
+
+'''
+Тот же анализ, что в task1, но для видео, кадр за кадром.
+Кадры читает отдельный поток в очередь из QUEUE_FRAMES кадров (cv2 при
+декодировании отпускает GIL, так что чтение идёт параллельно с анализом),
+а generator analyze_video отдаёт статистику по каждому кадру и накопленные
+гистограммы. В памяти одновременно не больше нескольких кадров.
+
+По кадру считаем: среднюю яркость по обеим формулам и энергию разности
+(сумма квадратов |gray1 - gray2|). Всё берётся из гистограмм, без
+дополнительных полнокадровых массивов.
+
+Запуск:
+    python video_analysis.py video.mp4 stats.csv
+'''
+
+QUEUE_FRAMES = 4
+SQUARES = np.arange(256, dtype=np.int64) ** 2
+
+
+def read_frames(capture, frames, stop):
+    while not stop.is_set():
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.put(frame)
+    frames.put(None)
+
+
+def analyze_video(path):
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Не удалось открыть {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0
+
+    frames = queue.Queue(maxsize=QUEUE_FRAMES)
+    stop = threading.Event()
+    reader = threading.Thread(target=read_frames, args=(capture, frames, stop), daemon=True)
+    reader.start()
+
+    # накопленные гистограммы серых вариантов по всем кадрам
+    total1, total2 = Histogram.empty(), Histogram.empty()
+    index = 0
+    try:
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+
+            gray1, gray2 = grayscale_fixed(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            hist1, hist2 = compute_histogram(gray1), compute_histogram(gray2)
+            diff_hist = compute_histogram(cv2.absdiff(gray1, gray2))
+            total1.merge(hist1)
+            total2.merge(hist2)
+
+            yield {
+                'frame': index,
+                'time': index / fps if fps else 0.0,
+                'mean_gray1': float(hist1.mean()[0]),
+                'mean_gray2': float(hist2.mean()[0]),
+                'diff_energy': int(diff_hist.counts[0] @ SQUARES),
+                'hist1': hist1,
+                'hist2': hist2,
+                'total1': total1,
+                'total2': total2,
+            }
+            index += 1
+    finally:
+        # если кадры перестали забирать раньше конца видео - останавливаем поток чтения
+        # и освобождаем очередь, чтобы он не завис на put, и только потом закрываем видео
+        stop.set()
+        while reader.is_alive():
+            try:
+                frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        capture.release()
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Использование: python video_analysis.py <видео> <статистика.csv>")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    frames = 0
+    stats = None
+    with open(sys.argv[2], 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frame', 'time', 'mean_gray1', 'mean_gray2', 'diff_energy'])
+        for stats in analyze_video(sys.argv[1]):
+            writer.writerow([stats['frame'], f"{stats['time']:.3f}", f"{stats['mean_gray1']:.3f}",
+                             f"{stats['mean_gray2']:.3f}", stats['diff_energy']])
+            frames += 1
+    elapsed = time.perf_counter() - start
+
+    if stats is None:
+        print("В видео нет кадров")
+        return
+    print(f"Кадров: {frames}, {frames / elapsed:.1f} кадр/с")
+    print(f"Средняя яркость за всё видео: {stats['total1'].mean()[0]:.2f} (формула 1), "
+          f"{stats['total2'].mean()[0]:.2f} (формула 2)")
+
+
+if __name__ == '__main__':
+    main()
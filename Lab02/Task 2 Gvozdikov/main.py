@@ -1,41 +1,69 @@
+import os
+import sys
 import cv2
 import matplotlib.pyplot as plt
 
-image = cv2.imread('dog.webp')
+# Гистограммы считаются общим модулем из задания 1, своей копии не держим.
+# Модуль импортируют и для пакетной обработки, поэтому папку добавляем в конец пути поиска
+# и только один раз: модули вызывающего кода с теми же именами остаются главнее.
+TASK1_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Task 1 Luneva'))
+if TASK1_DIR not in sys.path:
+    sys.path.append(TASK1_DIR)
+from histograms import compute_histogram
 
-image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+# imread хранит каналы в порядке B, G, R - вместо преобразования в RGB (полная копия)
+# берём каналы прямо из исходного буфера срезами с шагом 3, без копирования
+def split_channels(image):
+    return image[:,:,2], image[:,:,1], image[:,:,0]
 
-R, G, B = image_rgb[:,:,0], image_rgb[:,:,1], image_rgb[:,:,2]
+# гистограммы всех трёх каналов за один проход по изображению, в порядке R, G, B
+def channel_histograms(image):
+    return compute_histogram(image).counts[::-1]
 
-plt.figure(figsize=(12,4))
+# для пакетной обработки: каналы и их гистограммы одного файла
+def analyze(path):
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Не удалось прочитать {path}")
+    return split_channels(image), channel_histograms(image)
 
-plt.subplot(1,3,1)
-plt.imshow(R, cmap='Reds')
-plt.title('Красный канал')
-plt.axis('off')
+def show_channels(R, G, B):
+    plt.figure(figsize=(12,4))
 
-plt.subplot(1,3,2)
-plt.imshow(G, cmap='Greens')
-plt.title('Зеленый канал')
-plt.axis('off')
+    plt.subplot(1,3,1)
+    plt.imshow(R, cmap='Reds')
+    plt.title('Красный канал')
+    plt.axis('off')
 
-plt.subplot(1,3,3)
-plt.imshow(B, cmap='Blues')
-plt.title('Синий канал')
-plt.axis('off')
+    plt.subplot(1,3,2)
+    plt.imshow(G, cmap='Greens')
+    plt.title('Зеленый канал')
+    plt.axis('off')
 
-plt.show()
+    plt.subplot(1,3,3)
+    plt.imshow(B, cmap='Blues')
+    plt.title('Синий канал')
+    plt.axis('off')
 
-colors = ('r','g','b')
-channels = (R,G,B)
+    plt.show()
 
-plt.figure(figsize=(8,5))
-for chan, color in zip(channels, colors):
-    hist = cv2.calcHist([chan],[0],None,[256],[0,256])
-    plt.plot(hist, color=color)
-    plt.xlim([0,256])
+def show_histograms(histograms):
+    colors = ('r','g','b')
 
-plt.title('Гистограммы каналов RGB')
-plt.xlabel('Интенсивность')
-plt.ylabel('Количество пикселей')
-plt.show()
+    plt.figure(figsize=(8,5))
+    for counts, color in zip(histograms, colors):
+        plt.plot(counts, color=color)
+        plt.xlim([0,256])
+
+    plt.title('Гистограммы каналов RGB')
+    plt.xlabel('Интенсивность')
+    plt.ylabel('Количество пикселей')
+    plt.show()
+
+def main():
+    (R, G, B), histograms = analyze('dog.webp')
+    show_channels(R, G, B)
+    show_histograms(histograms)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import time
+import numpy as np
+from hsv_engine import (rgb_to_hsv_pixel, hsv_to_rgb_pixel, apply_hsv, apply_hsv_approx,
+                        rgb_to_hsv, adjust_hsv, hsv_to_rgb)
+from hsv_lut import build_lut, apply_lut
+
+'''
+Сравнение поточечного (старого) и векторизованного преобразования HSV.
+Поточечный вариант на 12-24 Мп идёт минутами, поэтому его скорость меряем
+на выборке из SAMPLE_PIXELS пикселей и пересчитываем на всё изображение.
+Заодно проверяем, что результаты совпадают с точностью до ±1.
+Режимы LUT и матрицы YIQ приближённые, для них печатаем максимальное
+и среднее отличие и PSNR относительно точного режима.
+Столбец "плоскости" - точный режим, когда плоскости HSV уже посчитаны
+(как в редакторе при движении слайдеров): меряется только настройка и обратный перевод.
+'''
+
+SIZES = {
+    '1 Мп': (1000, 1000),
+    '12 Мп': (3000, 4000),
+    '24 Мп': (4000, 6000),
+}
+SAMPLE_PIXELS = 100_000
+PARAMS = (45, 0.3, -0.2) # сдвиг оттенка, насыщенность, яркость
+
+
+def apply_hsv_scalar(pixels, hue_shift, sat_scale, val_scale):
+    result = []
+    for red, green, blue in pixels:
+        h, s, v = rgb_to_hsv_pixel(int(red), int(green), int(blue))
+        h = (h + hue_shift) % 360
+        s = min(1, max(0, s * (sat_scale + 1))) * 100
+        v = min(1, max(0, v * (val_scale + 1))) * 100
+        result.append(hsv_to_rgb_pixel(h, s, v))
+    return np.array(result, dtype=np.uint8)
+
+
+def error_metrics(result, reference):
+    diff = np.abs(result.astype(np.float64) - reference)
+    mse = np.mean(diff ** 2)
+    psnr = float('inf') if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+    return diff.max(), diff.mean(), psnr
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    sample = rng.integers(0, 256, (SAMPLE_PIXELS, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    reference = apply_hsv_scalar(sample, *PARAMS)
+    scalar_per_pixel = (time.perf_counter() - start) / SAMPLE_PIXELS
+
+    vectorized = apply_hsv(sample[np.newaxis], *PARAMS)[0]
+    max_diff = np.abs(vectorized.astype(np.int16) - reference).max()
+    print(f"Максимальное отличие от поточечной версии: {max_diff} (на {SAMPLE_PIXELS} пикселях)")
+
+    approximations = {
+        'LUT': apply_lut(sample[np.newaxis], build_lut(*PARAMS))[0],
+        'матрица YIQ': apply_hsv_approx(sample, *PARAMS),
+    }
+    for name, result in approximations.items():
+        max_err, mean_err, psnr = error_metrics(result, reference)
+        print(f"Режим {name}: максимальное отличие {max_err:.0f}, среднее {mean_err:.3f}, PSNR {psnr:.1f} дБ")
+
+    print(f"{'размер':>8} {'поточечно, с':>14} {'NumPy, с':>10} {'плоскости, с':>13} {'LUT, с':>8} {'YIQ, с':>8} {'ускорение':>10}")
+    for name, (height, width) in SIZES.items():
+        image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+        start = time.perf_counter()
+        apply_hsv(image, *PARAMS)
+        vector_time = time.perf_counter() - start
+
+        planes = rgb_to_hsv(image)
+        start = time.perf_counter()
+        hsv_to_rgb(*adjust_hsv(*planes, *PARAMS))
+        planes_time = time.perf_counter() - start
+        del planes
+
+        start = time.perf_counter()
+        apply_lut(image, build_lut(*PARAMS))
+        lut_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        apply_hsv_approx(image, *PARAMS)
+        approx_time = time.perf_counter() - start
+
+        scalar_time = scalar_per_pixel * height * width
+        print(f"{name:>8} {scalar_time:>14.1f} {vector_time:>10.3f} {planes_time:>13.3f} {lut_time:>8.3f} {approx_time:>8.3f} "
+              f"{scalar_time / vector_time:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from hsv_engine import apply_hsv, params_from_sliders
+from hsv_lut import build_lut, apply_lut
+
+'''
+Пакетная обработка без интерфейса: та же коррекция оттенка/насыщенности/яркости,
+что и в SimpleHSVEditor, но для целой папки или маски файлов.
+Файлы обрабатываются параллельно в пуле процессов, результаты печатаются
+в исходном порядке, в конце - пропускная способность.
+Результаты пишутся под теми же именами; если маска захватывает несколько папок
+и имена совпадают, сохраняются пути относительно общей папки исходников.
+Перезаписать исходники (например, -o указывает на папку с ними) нельзя.
+
+Пример:
+    python hsv_batch.py photos/ -o out/ --hue 30 --saturation 20 --brightness -10
+    python hsv_batch.py "photos/*.jpg" -o out/ --hue 30 --lut
+'''
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# состояние процесса пула, заполняется в _init_worker
+_settings = None
+
+
+def _init_worker(params, lut):
+    global _settings
+    _settings = {'params': params, 'lut': lut}
+
+
+def process_file(path, output_path):
+    '''
+    Обрабатывает один файл, результат пишет в output_path.
+    Возвращает (путь, байт прочитано, ошибка или None).
+    '''
+    try:
+        size = os.path.getsize(path)
+        rgb = np.asarray(Image.open(path).convert('RGB'))
+        if _settings['lut'] is not None:
+            result = apply_lut(rgb, _settings['lut'])
+        else:
+            result = apply_hsv(rgb, *_settings['params'])
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        Image.fromarray(result).save(output_path)
+        return path, size, None
+    except Exception as e:
+        return path, 0, e
+
+
+def collect_files(source):
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    return sorted(path for path in paths if path.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def output_paths(paths, output_dir):
+    '''
+    Пути результатов: по имени файла, а при совпадении имён - относительно общей папки исходников.
+    ValueError, если результат перезаписал бы исходный файл.
+    '''
+    names = [os.path.basename(path) for path in paths]
+    if len(set(names)) == len(names):
+        outputs = [os.path.join(output_dir, name) for name in names]
+    else:
+        common = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+        outputs = [os.path.join(output_dir, os.path.relpath(os.path.abspath(path), common)) for path in paths]
+    for path, output in zip(paths, outputs):
+        if os.path.realpath(output) == os.path.realpath(path):
+            raise ValueError(f"Результат перезапишет исходный файл {path}, укажите другую папку -o")
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетная коррекция HSV")
+    parser.add_argument('source', help="папка или маска файлов, например 'photos/*.jpg'")
+    parser.add_argument('-o', '--output', required=True, help="папка для результатов")
+    parser.add_argument('--hue', type=int, default=0, help="сдвиг оттенка, -360..360")
+    parser.add_argument('--saturation', type=int, default=0, help="насыщенность, -100..100 %%")
+    parser.add_argument('--brightness', type=int, default=0, help="яркость, -100..100 %%")
+    parser.add_argument('--lut', action='store_true', help="приближённый режим через 3D LUT")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    args = parser.parse_args()
+
+    paths = collect_files(args.source)
+    if not paths:
+        print(f"Нет изображений: {args.source}")
+        sys.exit(1)
+    try:
+        outputs = output_paths(paths, args.output)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    os.makedirs(args.output, exist_ok=True)
+
+    params = params_from_sliders(args.hue, args.saturation, args.brightness)
+    lut = build_lut(*params) if args.lut else None
+
+    start = time.perf_counter()
+    total_bytes = 0
+    failed = 0
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                             initargs=(params, lut)) as pool:
+        # map отдаёт результаты в порядке входных файлов
+        for number, (path, size, error) in enumerate(pool.map(process_file, paths, outputs), 1):
+            if error is not None:
+                failed += 1
+                print(f"[{number}/{len(paths)}] {path}: Error: {error}")
+            else:
+                total_bytes += size
+                print(f"[{number}/{len(paths)}] {path}")
+    elapsed = time.perf_counter() - start
+
+    done = len(paths) - failed
+    print(f"Готово: {done} из {len(paths)} за {elapsed:.2f} с, "
+          f"{done / elapsed:.2f} изобр./с, {total_bytes / elapsed / 1e6:.2f} МБ/с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+'''
+LRU-кэш готовых результатов с ограничением по памяти.
+Ключ - любой хешируемый кортеж (в редакторе: номер изображения, значения
+слайдеров, режим, предпросмотр/полное разрешение), значение - массив NumPy.
+При превышении бюджета выбрасываются давно не использованные записи.
+'''
+
+DEFAULT_BUDGET_BYTES = 512 * 1024 * 1024
+
+
+class ResultCache:
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        if result.nbytes > self.budget_bytes:
+            return
+        if key in self.entries:
+            self.used_bytes -= self.entries.pop(key).nbytes
+        # результат может быть показан снова, поэтому запрещаем его менять
+        result.flags.writeable = False
+        self.entries[key] = result
+        self.used_bytes += result.nbytes
+
+        while self.used_bytes > self.budget_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.used_bytes -= evicted.nbytes
+
+    def clear(self):
+        self.entries.clear()
+        self.used_bytes = 0
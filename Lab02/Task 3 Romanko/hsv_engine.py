@@ -0,0 +1,199 @@
+import numpy as np
+
+'''
+Векторизованные преобразования RGB <-> HSV над целыми массивами NumPy.
+Формулы те же, что и в поточечных rgb_to_hsv_pixel / hsv_to_rgb_pixel,
+только считаются сразу для всего изображения за один проход.
+
+H ∈ [0, 360]
+S ∈ [0, 1]
+V ∈ [0, 1]
+'''
+
+# для каждого сектора hi - какие из значений (value, vinc, vmin, vdec) идут в R, G, B
+_SECTOR_TABLE = np.array([
+    (0, 1, 2), # hi = 0: (value, vinc, vmin)
+    (3, 0, 2), # hi = 1: (vdec, value, vmin)
+    (2, 0, 1), # hi = 2: (vmin, value, vinc)
+    (2, 3, 0), # hi = 3: (vmin, vdec, value)
+    (1, 2, 0), # hi = 4: (vinc, vmin, value)
+    (0, 2, 3), # hi = 5: (value, vmin, vdec)
+], dtype=np.uint8)
+
+# переход RGB -> YIQ (Y - яркость, I и Q - цветность) и обратно
+_RGB_TO_YIQ = np.array([
+    (0.299, 0.587, 0.114),
+    (0.596, -0.274, -0.322),
+    (0.211, -0.523, 0.312),
+])
+_YIQ_TO_RGB = np.linalg.inv(_RGB_TO_YIQ)
+
+
+# H ∈ [0, 360]
+# S ∈ [0, 1]
+# V ∈ [0, 1]
+def rgb_to_hsv_pixel(r, g, b):
+    # нормализация
+    red = r / 255.0
+    green = g / 255.0
+    blue = b / 255.0
+
+    # находим максимальное и минимальное из всех цветов
+    min_val = min(red, green, blue)
+    max_val = max(red, green, blue)
+
+    # оттенок
+    hue = 0.0
+    if max_val == min_val:
+        hue = 0.0
+    elif max_val == red and green >= blue:
+        hue = 60 * (green - blue) / (max_val - min_val)
+    elif max_val == red and green < blue:
+        hue = 60 * (green - blue) / (max_val - min_val) + 360
+    elif max_val == green:
+        hue = 60 * (blue - red) / (max_val - min_val) + 120
+    elif max_val == blue:
+        hue = 60 * (red - green) / (max_val - min_val) + 240
+
+    # насыщенность
+    saturation = 0.0 if max_val == 0 else 1.0 - (min_val / max_val)
+
+    # яркость
+    value = max_val
+
+    return hue, saturation, value
+
+
+# H ∈ [0, 360]
+# S ∈ [0, 100]
+# V ∈ [0, 100]
+def hsv_to_rgb_pixel(hue, saturation, value):
+    hi = int(hue // 60) % 6
+
+    # значения в процентах
+    vmin = ((100 - saturation) * value) / 100
+    a = (value - vmin) * (hue % 60) / 60
+    vinc = (vmin + a)
+    vdec = (value - a)
+
+    # переводим в соответствии с распространенным представлением
+    vmin = int(vmin * 255 / 100)
+    value = int(value * 255 / 100)
+    vinc = int(vinc * 255 / 100)
+    vdec = int(vdec * 255 / 100)
+
+    if hi == 0: return (value, vinc, vmin)
+    elif hi == 1: return (vdec, value, vmin)
+    elif hi == 2: return (vmin, value, vinc)
+    elif hi == 3: return (vmin, vdec, value)
+    elif hi == 4: return (vinc, vmin, value)
+    else: return (value, vmin, vdec)
+
+
+def rgb_to_hsv(rgb):
+    '''
+    rgb - массив формы (..., 3) со значениями 0..255 (обычно uint8).
+    Возвращает три плоскости float32 той же формы без последней оси: h, s, v.
+    '''
+    # нормализация, каждый канал - отдельный непрерывный массив
+    red = rgb[..., 0].astype(np.float32) / 255
+    green = rgb[..., 1].astype(np.float32) / 255
+    blue = rgb[..., 2].astype(np.float32) / 255
+
+    max_val = np.maximum(np.maximum(red, green), blue)
+    min_val = np.minimum(np.minimum(red, green), blue)
+    delta = max_val - min_val
+    # чтобы не делить на ноль там, где max == min (там оттенок всё равно 0)
+    safe_delta = np.where(delta == 0, np.float32(1), delta)
+
+    # ветки проверяем в обратном порядке, чтобы более приоритетная перезаписала остальные
+    hue = (red - green) / safe_delta * 60 + 240
+    np.copyto(hue, (blue - red) / safe_delta * 60 + 120, where=max_val == green)
+    hue_red = (green - blue) / safe_delta * 60
+    hue_red[hue_red < 0] += 360 # green < blue
+    np.copyto(hue, hue_red, where=max_val == red)
+    hue[delta == 0] = 0
+
+    # насыщенность: 1 - min / max, а для чёрного 0
+    saturation = np.divide(min_val, max_val, out=np.ones_like(max_val), where=max_val != 0)
+    np.subtract(1, saturation, out=saturation)
+
+    return hue, saturation, max_val
+
+
+def params_from_sliders(hue, saturation, brightness):
+    '''
+    Значения слайдеров редактора (градусы, проценты, проценты) ->
+    (hue_shift, sat_scale, val_scale) для adjust_hsv.
+    '''
+    return hue, saturation / 100.0, brightness / 100.0
+
+
+def adjust_hsv(hue, saturation, value, hue_shift, sat_scale, val_scale):
+    '''
+    Сдвиг оттенка на hue_shift градусов и масштабирование насыщенности и яркости
+    в (sat_scale + 1) и (val_scale + 1) раз, как в слайдерах редактора.
+    '''
+    hue = np.mod(hue + np.float32(hue_shift), np.float32(360))
+    saturation = np.clip(saturation * np.float32(sat_scale + 1), 0, 1)
+    value = np.clip(value * np.float32(val_scale + 1), 0, 1)
+    return hue, saturation, value
+
+
+def hsv_to_rgb(hue, saturation, value, as_float=False):
+    '''
+    Обратное преобразование плоскостей h, s, v в массив uint8 формы (..., 3).
+    Округление вниз, как int() в hsv_to_rgb_pixel.
+    as_float=True - вернуть float32 в [0, 1] без округления (нужно для построения LUT).
+    '''
+    hi = (hue // 60).astype(np.uint8) % 6
+
+    vmin = (1 - saturation) * value
+    a = (value - vmin) * np.mod(hue, 60) / 60
+
+    # порядок плоскостей соответствует индексам в _SECTOR_TABLE
+    planes = [value, vmin + a, vmin, value - a]
+    if not as_float:
+        planes = [(plane * 255).astype(np.uint8) for plane in planes]
+
+    result = np.empty(hue.shape + (3,), dtype=planes[0].dtype)
+    for channel in range(3):
+        np.choose(_SECTOR_TABLE[:, channel][hi], planes, out=result[..., channel])
+    return result
+
+
+def apply_hsv(rgb, hue_shift, sat_scale, val_scale):
+    '''
+    Полный проход: RGB -> HSV -> изменение параметров -> RGB.
+    '''
+    hue, saturation, value = rgb_to_hsv(rgb)
+    hue, saturation, value = adjust_hsv(hue, saturation, value, hue_shift, sat_scale, val_scale)
+    return hsv_to_rgb(hue, saturation, value)
+
+
+def approx_matrix(hue_shift, sat_scale, val_scale):
+    '''
+    Приближённая коррекция одной матрицей 3x3: в пространстве YIQ поворачиваем
+    цветность (I, Q) на угол сдвига оттенка и растягиваем её в (sat_scale + 1) раз,
+    потом всё умножаем на (val_scale + 1).
+    Поворот идёт на минус угол, чтобы направление совпадало с оттенком HSV (R -> G -> B).
+    '''
+    angle = -np.radians(hue_shift)
+    chroma = max(0.0, sat_scale + 1)
+    cos, sin = chroma * np.cos(angle), chroma * np.sin(angle)
+    rotate = np.array([
+        (1, 0, 0),
+        (0, cos, -sin),
+        (0, sin, cos),
+    ])
+    return ((val_scale + 1) * _YIQ_TO_RGB @ rotate @ _RGB_TO_YIQ).astype(np.float32)
+
+
+def apply_hsv_approx(rgb, hue_shift, sat_scale, val_scale):
+    '''
+    Быстрый вариант apply_hsv: одно умножение на матрицу на пиксель вместо
+    кусочных формул HSV. Цвет немного отличается от точного режима.
+    '''
+    result = rgb.astype(np.float32) @ approx_matrix(hue_shift, sat_scale, val_scale).T
+    np.clip(result, 0, 255, out=result)
+    return result.astype(np.uint8)
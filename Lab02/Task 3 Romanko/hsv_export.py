@@ -0,0 +1,182 @@
+import os
+import struct
+import zlib
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PIL import Image
+from hsv_engine import apply_hsv
+from hsv_lut import apply_lut
+
+'''
+Экспорт в полном разрешении по полосам на всех ядрах.
+Исходное изображение один раз кладётся в разделяемую память, процессы
+пула читают из неё свои полосы строк и возвращают готовые полосы.
+Полосы пишутся на диск по порядку сразу, как готовы, а в работе
+одновременно находится не больше нескольких полос на процесс, поэтому
+память ограничена исходником + несколькими полосами.
+
+PNG пишется потоково своим кодировщиком (PIL так не умеет).
+Для остальных форматов результат собирается целиком и сохраняется через PIL.
+Уже посчитанный в редакторе результат сохраняется теми же писателями (export_array).
+'''
+
+STRIP_ROWS = 512
+STRIPS_PER_WORKER = 2 # сколько полос на процесс держим в работе одновременно
+
+# состояние процесса пула, заполняется в _init_worker
+_source = None
+
+
+def _init_worker(shm_name, shape, params, lut):
+    global _source
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _source = {
+        'shm': shm, # держим ссылку, иначе память отцепится
+        'rgb': np.ndarray(shape, dtype=np.uint8, buffer=shm.buf),
+        'params': params,
+        'lut': lut,
+    }
+
+
+def _process_strip(y0, y1):
+    rows = _source['rgb'][y0:y1]
+    if _source['lut'] is not None:
+        return apply_lut(rows, _source['lut'])
+    return apply_hsv(rows, *_source['params'])
+
+
+class PNGStreamWriter:
+    '''
+    Минимальный потоковый кодировщик PNG (8 бит, RGB): строки сжимаются
+    и пишутся в файл по мере поступления.
+    '''
+    def __init__(self, file_path, width, height):
+        self.file = open(file_path, 'wb')
+        self.compressor = zlib.compressobj(6)
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self.write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def write_chunk(self, chunk_type, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+
+    def write_rows(self, rows):
+        # перед каждой строкой байт фильтра 0 (без фильтра)
+        filtered = np.zeros((rows.shape[0], rows.shape[1] * 3 + 1), dtype=np.uint8)
+        filtered[:, 1:] = rows.reshape(rows.shape[0], -1)
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self.write_chunk(b'IDAT', data)
+
+    def close(self):
+        self.write_chunk(b'IDAT', self.compressor.flush())
+        self.write_chunk(b'IEND', b'')
+        self.file.close()
+
+    # при ошибке: закрыть файл и удалить недописанный PNG
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.file.name):
+            os.remove(self.file.name)
+
+
+class ArrayWriter:
+    '''
+    Для форматов без потоковой записи: собираем результат и сохраняем через PIL.
+    '''
+    def __init__(self, file_path, width, height):
+        self.file_path = file_path
+        self.result = np.empty((height, width, 3), dtype=np.uint8)
+        self.row = 0
+
+    def write_rows(self, rows):
+        self.result[self.row:self.row + rows.shape[0]] = rows
+        self.row += rows.shape[0]
+
+    def close(self):
+        Image.fromarray(self.result).save(self.file_path)
+
+    # файл создаётся только в close(), удалять нечего
+    def abort(self):
+        self.result = None
+
+
+def open_writer(file_path, width, height):
+    if file_path.lower().endswith('.png'):
+        return PNGStreamWriter(file_path, width, height)
+    return ArrayWriter(file_path, width, height)
+
+
+def export_array(rgb, file_path, progress=None):
+    '''
+    Сохраняет готовый результат rgb (массив uint8 (h, w, 3)) по полосам.
+    progress(percent) вызывается после записи каждой полосы.
+    '''
+    height, width = rgb.shape[:2]
+    writer = open_writer(file_path, width, height)
+    finished = False
+    try:
+        for y0 in range(0, height, STRIP_ROWS):
+            y1 = min(y0 + STRIP_ROWS, height)
+            writer.write_rows(rgb[y0:y1])
+            if progress is not None:
+                progress(100 * y1 // height)
+        writer.close()
+        finished = True
+    finally:
+        if not finished:
+            writer.abort()
+
+
+def export_tiled(image, file_path, params, lut=None, workers=None, progress=None):
+    '''
+    image - PIL Image, params - (hue_shift, sat_scale, val_scale),
+    lut - таблица из build_lut, если нужен режим LUT.
+    progress(percent) вызывается после записи каждой полосы.
+    '''
+    workers = workers or os.cpu_count() or 1
+    width, height = image.size
+    shape = (height, width, 3)
+
+    shm = shared_memory.SharedMemory(create=True, size=height * width * 3)
+    try:
+        # копируем в разделяемую память тоже по полосам, без полной промежуточной копии
+        source = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        for y0 in range(0, height, STRIP_ROWS):
+            y1 = min(y0 + STRIP_ROWS, height)
+            source[y0:y1] = np.asarray(image.crop((0, y0, width, y1)).convert('RGB'))
+
+        writer = open_writer(file_path, width, height)
+
+        strips = [(y0, min(y0 + STRIP_ROWS, height)) for y0 in range(0, height, STRIP_ROWS)]
+        finished = False
+        try:
+            # экспорт запускается из QThread: fork многопоточного процесса с Qt небезопасен,
+            # поэтому процессы пула запускаются заново (spawn)
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker,
+                                     initargs=(shm.name, shape, params, lut)) as pool:
+                in_flight = []
+                next_strip = 0
+                for done in range(len(strips)):
+                    # держим очередь заполненной, но не больше STRIPS_PER_WORKER полос на процесс
+                    while next_strip < len(strips) and len(in_flight) < workers * STRIPS_PER_WORKER:
+                        in_flight.append(pool.submit(_process_strip, *strips[next_strip]))
+                        next_strip += 1
+                    writer.write_rows(in_flight.pop(0).result())
+                    if progress is not None:
+                        progress(100 * (done + 1) // len(strips))
+            writer.close()
+            finished = True
+        finally:
+            if not finished:
+                writer.abort()
+    finally:
+        # массив смотрит в буфер разделяемой памяти, его нужно отпустить до close()
+        source = None
+        shm.close()
+        shm.unlink()
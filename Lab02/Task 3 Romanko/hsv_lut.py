@@ -0,0 +1,118 @@
+import numpy as np
+from hsv_engine import rgb_to_hsv, adjust_hsv, hsv_to_rgb
+
+'''
+Режим 3D LUT: настройку оттенка/насыщенности/яркости один раз считаем
+на сетке size x size x size цветов, а к пикселям применяем тетраэдральную
+интерполяцию по этой таблице в целых числах. Стоимость на пиксель не зависит
+от формул HSV и ниже, чем у точного режима даже с готовыми плоскостями HSV.
+Таблицу можно выгрузить в формат .cube (Adobe / Resolve).
+'''
+
+LUT_SIZE = 33
+
+
+def build_lut(hue_shift, sat_scale, val_scale, size=LUT_SIZE):
+    '''
+    Возвращает массив float32 формы (size, size, size, 3) со значениями в [0, 1],
+    индексы - [r, g, b] узла сетки.
+    '''
+    grid = np.linspace(0, 255, size, dtype=np.float32)
+    red, green, blue = np.meshgrid(grid, grid, grid, indexing='ij')
+    nodes = np.stack((red, green, blue), axis=-1)
+
+    hue, saturation, value = rgb_to_hsv(nodes)
+    hue, saturation, value = adjust_hsv(hue, saturation, value, hue_shift, sat_scale, val_scale)
+    return hsv_to_rgb(hue, saturation, value, as_float=True)
+
+
+# Узлы таблицы упаковываются в одно uint64: по FIELD бит на канал (r, g, b),
+# значение канала хранится с FRACTION двоичными знаками после запятой.
+# Веса интерполяции целые, от 0 до 1 << WEIGHT_BITS, и неотрицательны, поэтому
+# взвешенная сумма четырёх упакованных узлов считается сразу для трёх каналов
+# и не переполняет поле: 255 << FRACTION << WEIGHT_BITS < 1 << FIELD.
+FIELD = 21
+FRACTION = 5
+WEIGHT_BITS = 8
+
+
+def _pack(lut):
+    values = np.round(lut.reshape(-1, 3).astype(np.float64) * (255 << FRACTION)).astype(np.uint64)
+    return values[:, 0] | (values[:, 1] << np.uint64(FIELD)) | (values[:, 2] << np.uint64(2 * FIELD))
+
+
+def _axis_tables(size):
+    # для каждого значения канала 0..255 - номер нижнего узла сетки и целый вес верхнего
+    position = np.arange(256) * (size - 1) / 255
+    lower = np.minimum(position.astype(np.int32), size - 2)
+    weight = np.round((position - lower) * (1 << WEIGHT_BITS)).astype(np.uint16)
+    return lower, weight
+
+
+def apply_lut(rgb, lut):
+    '''
+    rgb - массив uint8 формы (..., 3), lut - результат build_lut.
+    Тетраэдральная интерполяция: куб сетки делится на 6 тетраэдров по порядку
+    дробных частей r, g, b, и на пиксель нужны только 4 узла вместо 8.
+    Всё в целых числах: номера узлов и веса - из таблиц на 256 значений канала.
+    '''
+    size = lut.shape[0]
+    packed = _pack(lut)
+    lower, weight = _axis_tables(size)
+    # шаг по развёрнутой таблице вдоль оси b, g, r и до противоположного угла куба
+    strides = np.array([1, size, size * size], dtype=np.int32)
+    corner = int(strides.sum())
+
+    # ключ канала: вес * 4 + номер оси (b = 0, g = 1, r = 2). Ключи всех осей разные,
+    # поэтому по максимуму и минимуму ключа однозначно видны оси и их веса
+    red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    base = (lower * strides[2])[red]
+    base += (lower * strides[1])[green]
+    base += lower[blue]
+    key_r, key_g, key_b = (weight * 4 + 2)[red], (weight * 4 + 1)[green], (weight * 4)[blue]
+
+    key_max = np.maximum(key_r, key_g)
+    np.maximum(key_max, key_b, out=key_max)
+    key_min = np.minimum(key_r, key_g)
+    np.minimum(key_min, key_b, out=key_min)
+    key_mid = key_r
+    key_mid += key_g
+    key_mid += key_b
+    key_mid -= key_max
+    key_mid -= key_min
+
+    # вершины тетраэдра: нижний узел, шаг по оси с наибольшим весом,
+    # противоположный угол без шага по оси с наименьшим весом, противоположный угол
+    second = strides[key_max & 3]
+    second += base
+    third = strides[key_min & 3]
+    np.subtract(base + corner, third, out=third)
+    key_max >>= 2
+    key_mid >>= 2
+    key_min >>= 2
+
+    total = packed[base] * ((1 << WEIGHT_BITS) - key_max)
+    total += packed[second] * (key_max - key_mid)
+    total += packed[third] * (key_mid - key_min)
+    base += corner
+    total += packed[base] * key_min
+
+    # округление вниз, как в точном режиме; запись в uint8 берёт младшие 8 бит поля
+    total >>= np.uint64(FRACTION + WEIGHT_BITS)
+    result = np.empty(rgb.shape, dtype=np.uint8)
+    for channel in range(3):
+        result[..., channel] = total
+        total >>= np.uint64(FIELD)
+    return result
+
+
+def write_cube(file_path, lut, title='HSV adjustment'):
+    size = lut.shape[0]
+    with open(file_path, 'w') as f:
+        f.write(f'TITLE "{title}"\n')
+        f.write(f'LUT_3D_SIZE {size}\n')
+        f.write('DOMAIN_MIN 0.0 0.0 0.0\n')
+        f.write('DOMAIN_MAX 1.0 1.0 1.0\n')
+        # в .cube быстрее всего меняется красный канал, поэтому идём по [b, g, r]
+        for r, g, b in lut.transpose(2, 1, 0, 3).reshape(-1, 3):
+            f.write(f'{r:.6f} {g:.6f} {b:.6f}\n')
@@ -0,0 +1,107 @@
+import threading
+import numpy as np
+from PyQt6.QtCore import QThread, pyqtSignal
+
+'''
+Фоновый поток для обработки изображения, чтобы не подвешивать интерфейс.
+Одновременно хранится только одна ожидающая задача: новая задача вытесняет
+старую, а выполняющаяся задача бросается на границе полосы, как только
+пришла более новая. Поэтому до конца досчитывается только последний набор
+параметров слайдеров.
+'''
+
+STRIP_ROWS = 256 # сколько строк обрабатываем между проверками отмены
+
+
+class HSVWorker(QThread):
+    progress = pyqtSignal(int, int) # номер задачи, процент
+    job_finished = pyqtSignal(int, str, object) # номер задачи, вид ('preview' / 'full'), массив uint8
+    job_failed = pyqtSignal(int, str, object) # номер задачи, вид, исключение
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.condition = threading.Condition()
+        self.pending = None
+        self.last_job_id = 0
+        self.running = True
+
+    def submit(self, kind, height, process_rows):
+        '''
+        process_rows(y0, y1) должна вернуть строки [y0, y1) результата.
+        Возвращает номер задачи.
+        '''
+        with self.condition:
+            self.last_job_id += 1
+            self.pending = (self.last_job_id, kind, height, process_rows)
+            self.condition.notify()
+            return self.last_job_id
+
+    def cancel(self):
+        # делает все поставленные задачи устаревшими, текущая бросится на границе полосы
+        with self.condition:
+            self.last_job_id += 1
+            self.pending = None
+
+    def is_stale(self, job_id):
+        return job_id != self.last_job_id
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.pending = None
+            self.condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                job_id, kind, height, process_rows = self.pending
+                self.pending = None
+
+            # ошибка задачи (например, MemoryError на большом скане) не должна останавливать поток:
+            # задача бросается, о ней сообщается сигналом, следующие задачи выполняются как обычно
+            try:
+                result = self.run_job(job_id, height, process_rows)
+            except Exception as e:
+                self.job_failed.emit(job_id, kind, e)
+                continue
+            if result is not None:
+                self.job_finished.emit(job_id, kind, result)
+
+    # результат задачи или None, если она устарела
+    def run_job(self, job_id, height, process_rows):
+        result = None
+        for y0 in range(0, height, STRIP_ROWS):
+            if self.is_stale(job_id):
+                return None
+            y1 = min(y0 + STRIP_ROWS, height)
+            rows = process_rows(y0, y1)
+            if result is None:
+                result = np.empty((height,) + rows.shape[1:], dtype=rows.dtype)
+            result[y0:y1] = rows
+            self.progress.emit(job_id, 100 * y1 // height)
+        return result
+
+
+class ExportThread(QThread):
+    '''
+    Запускает долгий экспорт export(progress) вне потока интерфейса.
+    '''
+    progress = pyqtSignal(int) # процент
+    export_finished = pyqtSignal(object) # None или исключение
+
+    def __init__(self, export, parent=None):
+        super().__init__(parent)
+        self.export = export
+
+    def run(self):
+        try:
+            self.export(self.progress.emit)
+        except Exception as e:
+            self.export_finished.emit(e)
+        else:
+            self.export_finished.emit(None)
@@ -1,15 +1,53 @@
 import sys
+import numpy as np
 from PIL import Image
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, 
-                             QPushButton, QSlider, QLabel, QFileDialog, QWidget)
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QPushButton,
+                             QSlider, QLabel, QFileDialog, QWidget, QProgressBar, QCheckBox)
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap, QImage
+from PyQt6 import sip
+from hsv_engine import rgb_to_hsv, adjust_hsv, hsv_to_rgb, params_from_sliders, apply_hsv_approx
+from hsv_worker import HSVWorker, ExportThread
+from hsv_lut import build_lut, apply_lut, write_cube
+from hsv_export import export_tiled, export_array
+from hsv_cache import ResultCache, DEFAULT_BUDGET_BYTES
 
 class SimpleHSVEditor(QMainWindow):
-    def __init__(self):
+    def __init__(self, cache_budget=DEFAULT_BUDGET_BYTES):
         super().__init__()
         self.original_image = None
+        # номер загруженного изображения, входит в ключ кэша результатов
+        self.image_id = 0
+        # результат в полном разрешении (массив uint8)
         self.processed_image = None
+        # массив, который сейчас показан, и последняя отмасштабированная под image_label картинка
+        # из него: (размер, QPixmap). Храним одну - при изменении размера окна старые не нужны
+        self.displayed_array = None
+        self.display_cache = None
+        # плоскости H, S, V исходного изображения: (номер изображения, плоскости).
+        # Считаются один раз, в фоновом потоке при первой задаче полного разрешения
+        self.hsv_planes = None
+        # исходное изображение как массив RGB (нужно режиму LUT)
+        self.rgb_array = None
+        # то же для уменьшенной копии под размер image_label (быстрый предпросмотр)
+        self.preview_planes = None
+        self.preview_rgb = None
+        self.preview_size = None
+        # номер фоновой задачи, считающей полное разрешение
+        self.full_job_id = None
+        # поток, который сейчас сохраняет изображение
+        self.export_thread = None
+        # уже посчитанные результаты, чтобы при возврате слайдера не считать заново
+        self.result_cache = ResultCache(cache_budget)
+        # ключ кэша для последней поставленной задачи (досчитывается только она)
+        self.last_job_key = None
+        
+        self.worker = HSVWorker(self)
+        self.worker.progress.connect(self.on_job_progress)
+        self.worker.job_finished.connect(self.on_job_finished)
+        self.worker.job_failed.connect(self.on_job_failed)
+        self.worker.start()
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -36,16 +74,43 @@ class SimpleHSVEditor(QMainWindow):
         layout.addWidget(self.brightness_slider['label'])
         layout.addWidget(self.brightness_slider['slider'])
         
+        # режим LUT: настройка считается на сетке 33x33x33 и интерполируется, примерно вдвое быстрее
+        # точного режима даже с готовыми плоскостями HSV. Результат приближённый: отличие от точного
+        # растёт при больших насыщенности и яркости, где значения упираются в границу (bench_hsv)
+        self.lut_checkbox = QCheckBox("Режим LUT")
+        self.lut_checkbox.toggled.connect(self.update_display)
+        layout.addWidget(self.lut_checkbox)
+        
+        # приближённый режим (матрица в YIQ) только для предпросмотра, сохранение всегда точное
+        self.approx_checkbox = QCheckBox("Быстрый приближённый предпросмотр")
+        self.approx_checkbox.toggled.connect(self.update_display)
+        layout.addWidget(self.approx_checkbox)
+        
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+        layout.addWidget(self.progress_bar)
+        
+        # у сохранения свой индикатор: полоса выше прячется при каждом движении слайдера
+        self.export_progress_bar = QProgressBar()
+        self.export_progress_bar.setRange(0, 100)
+        self.export_progress_bar.setFormat("Сохранение: %p%")
+        self.export_progress_bar.hide()
+        layout.addWidget(self.export_progress_bar)
+        
         buttons_layout = QVBoxLayout()
         
         self.load_btn = QPushButton("Загрузить")
         self.save_btn = QPushButton("Сохранить")
+        self.export_lut_btn = QPushButton("Экспорт LUT")
         
         self.load_btn.clicked.connect(self.load_image)
         self.save_btn.clicked.connect(self.save_image)
+        self.export_lut_btn.clicked.connect(self.export_lut)
         
         buttons_layout.addWidget(self.load_btn)
         buttons_layout.addWidget(self.save_btn)
+        buttons_layout.addWidget(self.export_lut_btn)
         
         layout.addLayout(buttons_layout)
         central_widget.setLayout(layout)
@@ -53,6 +118,11 @@ class SimpleHSVEditor(QMainWindow):
         self.hue_slider['slider'].valueChanged.connect(self.update_display)
         self.saturation_slider['slider'].valueChanged.connect(self.update_display)
         self.brightness_slider['slider'].valueChanged.connect(self.update_display)
+        
+        # полное разрешение считаем, только когда отпустили слайдер
+        self.hue_slider['slider'].sliderReleased.connect(self.render_full_image)
+        self.saturation_slider['slider'].sliderReleased.connect(self.render_full_image)
+        self.brightness_slider['slider'].sliderReleased.connect(self.render_full_image)
     
     def create_slider(self, text, min_val, max_val, default):
         slider_dict = {}
@@ -62,91 +132,90 @@ class SimpleHSVEditor(QMainWindow):
         slider_dict['slider'].setValue(default)
         return slider_dict
     
-    # H ∈ [0, 360]  
-    # S ∈ [0, 1] 
-    # V ∈ [0, 1]
-    def rgb_to_hsv(self, r, g, b):
-        # нормализация
-        red = r / 255.0
-        green = g / 255.0
-        blue= b / 255.0
-        
-        # находим максимальное и минимальное из всех цветов
-        min_val = min(red, green, blue)
-        max_val = max(red, green, blue)
-        
-        # оттенок
-        hue = 0.0
-        if max_val == min_val:
-            hue = 0.0
-        elif max_val == red and green >= blue:
-            hue = 60 * (green - blue) / (max_val - min_val)
-        elif max_val == red and green < blue:
-            hue = 60 * (green - blue) / (max_val - min_val) + 360
-        elif max_val == green:
-            hue = 60 * (blue - red) / (max_val - min_val) + 120
-        elif max_val == blue:
-            hue = 60 * (red - green) / (max_val - min_val) + 240
-        
-        # насыщенность
-        saturation = 0.0 if max_val == 0 else 1.0 - (min_val / max_val)
-
-        # яркость
-        value = max_val
+    def current_params(self):
+        return params_from_sliders(
+            self.hue_slider['slider'].value(),
+            self.saturation_slider['slider'].value(),
+            self.brightness_slider['slider'].value()
+        )
+    
+    # вызывается из фонового потока, поэтому параметры передаются готовыми, а не читаются со слайдеров.
+    # RGB -> HSV считается один раз на изображение, здесь только изменение параметров и обратное преобразование
+    def apply_hsv_adjustments(self, planes, params, y0, y1):
+        hue, saturation, value = (plane[y0:y1] for plane in planes)
+        return hsv_to_rgb(*adjust_hsv(hue, saturation, value, *params))
+    
+    def result_key(self, kind):
+        # предпросмотр зависит ещё и от размера уменьшенной копии
+        size = (self.image_label.width(), self.image_label.height()) if kind == 'preview' else None
+        return (
+            self.image_id,
+            self.hue_slider['slider'].value(),
+            self.saturation_slider['slider'].value(),
+            self.brightness_slider['slider'].value(),
+            kind,
+            self.lut_checkbox.isChecked(),
+            kind == 'preview' and self.approx_checkbox.isChecked(),
+            size
+        )
+    
+    def submit_job(self, kind):
+        params = self.current_params()
+        self.last_job_key = self.result_key(kind)
+        if kind == 'preview' and self.approx_checkbox.isChecked():
+            rgb = self.get_preview_rgb()
+            return self.worker.submit(kind, rgb.shape[0], lambda y0, y1: apply_hsv_approx(rgb[y0:y1], *params))
+        
+        if self.lut_checkbox.isChecked():
+            # таблица строится один раз на задачу, дальше только выборка из неё
+            rgb = self.get_full_rgb() if kind == 'full' else self.get_preview_rgb()
+            lut = build_lut(*params)
+            return self.worker.submit(kind, rgb.shape[0], lambda y0, y1: apply_lut(rgb[y0:y1], lut))
         
-        return hue, saturation, value
+        if kind == 'full':
+            # плоскости полного разрешения считаются на первой полосе в фоновом потоке, а не в окне
+            rgb, image_id = self.get_full_rgb(), self.image_id
+            return self.worker.submit(
+                kind, rgb.shape[0],
+                lambda y0, y1: self.apply_hsv_adjustments(self.get_full_planes(rgb, image_id), params, y0, y1)
+            )
+        
+        planes = self.get_preview_planes()
+        return self.worker.submit(
+            kind, planes[0].shape[0],
+            lambda y0, y1: self.apply_hsv_adjustments(planes, params, y0, y1)
+        )
     
-    # H ∈ [0, 360]  
-    # S ∈ [0, 100] 
-    # V ∈ [0, 100]
-    def hsv_to_rgb(self, hue, saturation, value):
-        hi = int(hue // 60) % 6
-
-        # значения в процентах
-        vmin = ((100 - saturation) * value) / 100
-        a = (value - vmin) * (hue % 60) / 60
-        vinc = (vmin + a)
-        vdec = (value - a)
-        
-        # переводим в соответствии с распространенным представлением
-        vmin = int(vmin * 255 / 100)
-        value = int(value * 255 / 100)
-        vinc = int(vinc * 255 / 100)
-        vdec = int(vdec * 255 / 100)
-
-        if hi == 0: return (value, vinc, vmin)
-        elif hi == 1: return (vdec, value, vmin)
-        elif hi == 2: return (vmin, value, vinc)
-        elif hi == 3: return (vmin, vdec, value)
-        elif hi == 4: return (vinc, vmin, value)
-        else: return (value, vmin, vdec)
-    
-    def apply_hsv_adjustments(self):
-        if self.original_image is None:
-            return None
-        
-        hue_shift = self.hue_slider['slider'].value()
-        sat_scale = self.saturation_slider['slider'].value() / 100.0
-        val_scale = self.brightness_slider['slider'].value() / 100.0
-        
-        img = self.original_image.convert('RGB')
-        width, height = img.size
-        result = Image.new('RGB', (width, height))
-        
-        for y in range(height):
-            for x in range(width):
-                red, green, blue = img.getpixel((x, y))
-                h, s, v = self.rgb_to_hsv(red, green, blue)
-                
-                # изменение значений оттенка, насыщенности и яркости
-                h = (h + hue_shift) % 360 # от 0 до 360
-                s = min(1,max(0, s * (sat_scale + 1))) * 100 # от 0 до 100
-                v = min(1,max(0, v * (val_scale + 1))) * 100 # от 0 до 100
-                
-                new_r, new_g, new_b = self.hsv_to_rgb(h, s, v)
-                result.putpixel((x, y), (new_r, new_g, new_b))
-        
-        return result
+    def get_full_rgb(self):
+        if self.rgb_array is None:
+            self.rgb_array = np.asarray(self.original_image.convert('RGB'))
+        return self.rgb_array
+    
+    # Вызывается из фонового потока. Пока плоскости считались, могли загрузить другое изображение,
+    # поэтому они хранятся вместе с номером изображения и чужие не используются
+    def get_full_planes(self, rgb, image_id):
+        cached = self.hsv_planes
+        if cached is None or cached[0] != image_id:
+            cached = (image_id, rgb_to_hsv(rgb))
+            self.hsv_planes = cached
+        return cached[1]
+    
+    def get_preview_rgb(self):
+        # пересоздаём уменьшенную копию только если поменялся размер области показа
+        size = (self.image_label.width(), self.image_label.height())
+        if self.preview_rgb is None or self.preview_size != size:
+            preview_image = self.original_image.convert('RGB')
+            preview_image.thumbnail(size, Image.Resampling.LANCZOS)
+            self.preview_rgb = np.asarray(preview_image)
+            self.preview_planes = None
+            self.preview_size = size
+        return self.preview_rgb
+    
+    def get_preview_planes(self):
+        preview_rgb = self.get_preview_rgb()
+        if self.preview_planes is None:
+            self.preview_planes = rgb_to_hsv(preview_rgb)
+        return self.preview_planes
     
     def update_display(self):
         self.hue_slider['label'].setText(f"Hue: {self.hue_slider['slider'].value()}°")
@@ -154,26 +223,94 @@ class SimpleHSVEditor(QMainWindow):
         self.brightness_slider['label'].setText(f"Brightness: {self.brightness_slider['slider'].value()}%")
         
         if self.original_image is not None:
-            self.processed_image = self.apply_hsv_adjustments()
-            self.show_image(self.processed_image)
+            # полноразмерный результат устарел, пересчитаем его при отпускании слайдера или сохранении.
+            # новая задача предпросмотра вытесняет все незаконченные
+            self.processed_image = None
+            self.full_job_id = None
+            self.progress_bar.hide()
+            
+            cached = self.result_cache.get(self.result_key('preview'))
+            if cached is not None:
+                # незаконченные задачи больше не нужны, иначе они перерисуют картинку старым результатом
+                self.worker.cancel()
+                self.show_image(cached)
+            else:
+                self.submit_job('preview')
     
-    def show_image(self, image):
-        qimage = QImage(
-            image.tobytes(), 
-            image.width, 
-            image.height, 
-            image.width * 3, 
-            QImage.Format.Format_RGB888
-        )
-        pixmap = QPixmap.fromImage(qimage)
+    def render_full_image(self):
+        if self.original_image is None or self.processed_image is not None:
+            return
+        # не перезапускаем задачу, если она уже считает текущие параметры
+        if self.full_job_id is not None and not self.worker.is_stale(self.full_job_id):
+            return
         
-        scaled_pixmap = pixmap.scaled(
-            self.image_label.width(), 
-            self.image_label.height(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        self.image_label.setPixmap(scaled_pixmap)
+        cached = self.result_cache.get(self.result_key('full'))
+        if cached is not None:
+            self.worker.cancel()
+            self.processed_image = cached
+            self.show_image(cached)
+        else:
+            self.full_job_id = self.submit_job('full')
+    
+    def on_job_progress(self, job_id, percent):
+        if job_id == self.full_job_id:
+            self.progress_bar.setValue(percent)
+            self.progress_bar.setVisible(percent < 100)
+    
+    def on_job_finished(self, job_id, kind, result):
+        # сигнал мог прийти уже после того, как поставили задачу новее
+        if self.worker.is_stale(job_id):
+            return
+        
+        self.result_cache.put(self.last_job_key, result)
+        if kind == 'preview':
+            self.show_image(result)
+        else:
+            # задача полного разрешения могла вытеснить последний предпросмотр, поэтому показываем и её
+            self.processed_image = result
+            self.full_job_id = None
+            self.progress_bar.hide()
+            self.show_image(self.processed_image)
+    
+    def on_job_failed(self, job_id, kind, error):
+        print(f"Error: {error}")
+        if job_id == self.full_job_id:
+            self.full_job_id = None
+            self.progress_bar.hide()
+    
+    def show_image(self, rgb):
+        # QImage оборачивает буфер массива без копирования, но ссылку на него не держит - храним сами
+        self.displayed_array = np.ascontiguousarray(rgb)
+        self.display_cache = None
+        self.refresh_display()
+    
+    def refresh_display(self):
+        size = (self.image_label.width(), self.image_label.height())
+        if self.display_cache is not None and self.display_cache[0] == size:
+            pixmap = self.display_cache[1]
+        else:
+            rgb = self.displayed_array
+            qimage = QImage(
+                sip.voidptr(rgb.ctypes.data),
+                rgb.shape[1],
+                rgb.shape[0],
+                rgb.strides[0],
+                QImage.Format.Format_RGB888
+            )
+            # масштабируем сам QImage, чтобы QPixmap создавался уже размером с image_label
+            pixmap = QPixmap.fromImage(qimage.scaled(
+                size[0],
+                size[1],
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            ))
+            self.display_cache = (size, pixmap)
+        self.image_label.setPixmap(pixmap)
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.displayed_array is not None:
+            self.refresh_display()
     
     def load_image(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -183,23 +320,65 @@ class SimpleHSVEditor(QMainWindow):
         if file_path:
             try:
                 self.original_image = Image.open(file_path)
+                self.image_id += 1
+                # кэш плоскостей HSV относится к старому изображению
+                self.hsv_planes = None
+                self.rgb_array = None
+                self.preview_rgb = None
+                self.preview_planes = None
                 self.update_display()
             except Exception as e:
                 print(f"Error: {e}")
     
     def save_image(self):
-        if self.processed_image is None:
+        if self.original_image is None or self.export_thread is not None:
             return
         
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "Сохранить", "image.jpg", "JPEG (*.jpg);;PNG (*.png)"
+            self, "Сохранить", "image.png", "PNG (*.png);;JPEG (*.jpg)"
+        )
+        
+        if file_path:
+            if self.processed_image is not None:
+                # полное разрешение для текущих параметров уже посчитано (при отпускании слайдера) - пишем его
+                result = self.processed_image
+                export = lambda progress: export_array(result, file_path, progress)
+            else:
+                # иначе считаем заново по полосам на всех ядрах, не держа весь результат в памяти
+                params = self.current_params()
+                lut = build_lut(*params) if self.lut_checkbox.isChecked() else None
+                image = self.original_image
+                export = lambda progress: export_tiled(image, file_path, params, lut, progress=progress)
+            self.export_thread = ExportThread(export, self)
+            self.export_thread.progress.connect(self.export_progress_bar.setValue)
+            self.export_thread.export_finished.connect(self.on_export_finished)
+            self.export_progress_bar.setValue(0)
+            self.export_progress_bar.show()
+            self.export_thread.start()
+    
+    def on_export_finished(self, error):
+        self.export_thread.wait()
+        self.export_thread = None
+        self.export_progress_bar.hide()
+        if error is not None:
+            print(f"Error: {error}")
+    
+    def export_lut(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт LUT", "hsv.cube", "Cube LUT (*.cube)"
         )
         
         if file_path:
             try:
-                self.processed_image.save(file_path)
+                write_cube(file_path, build_lut(*self.current_params()))
             except Exception as e:
                 print(f"Error: {e}")
+    
+    def closeEvent(self, event):
+        self.worker.stop()
+        if self.export_thread is not None:
+            self.export_thread.wait()
+        super().closeEvent(event)
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,304 @@
+import argparse
+import os
+import time
+import tracemalloc
+import cv2
+import numpy as np
+# виджет редактора создаётся без окна
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QColor
+from task1 import DrawingWidget
+from flood_fill import flood_spans, spans_to_mask
+from regions import RegionIndex, TileRegions
+from canvas import TiledCanvas
+from border import DIRECTIONS, trace_mask, CanvasCodes, find_right, trace_moore
+
+'''
+Замеры заливки и обхода границы из task1 без окна.
+Холсты синтетические: лабиринт, спираль, шахматка и большая открытая область
+(кольцо) в нескольких разрешениях. На каждом холсте из точки щелчка:
+    заливка:  scanline (flood_spans), разметка (RegionIndex: построение и поиск),
+              плитки (TileRegions на TiledCanvas: первый раз и с готовой разметкой),
+              запись в виджет (DrawingWidget: заливка цветом и паттерном с записью плиток);
+    граница:  маска (trace_mask), плитки (CanvasCodes на TiledCanvas).
+Маска каждой заливки сравнивается попиксельно с cv2.floodFill, холст после заливки
+в виджете - с тем же, посчитанным NumPy по всему холсту (fill_pixels, pattern_pixels),
+а обход - с исходным обходом по восьми соседям (trace_reference).
+Время и пиковая память меряются в разных запусках: tracemalloc сильно замедляет код на Python.
+
+Запуск:
+    python bench_fill.py
+    python bench_fill.py --sizes 800x600 3200x2400 --canvases maze spiral
+'''
+
+SIZES = ['400x300', '800x600', '1600x1200']
+BLACK = 0xff000000
+WHITE = 0xffffffff
+RED = 0xffff0000
+
+
+# Лабиринт: клетки cell x cell, стены толщиной wall, проходы прорезаны обходом в глубину.
+# Лабиринт идеальный, так что все проходы - одна область.
+def maze(height, width, cell=8, wall=2, seed=0):
+    rng = np.random.default_rng(seed)
+    rows, columns = (height - wall) // cell, (width - wall) // cell
+    border = np.ones((height, width), dtype=bool)
+    visited = np.zeros((rows, columns), dtype=bool)
+    stack = [(0, 0)]
+    visited[0, 0] = True
+    while stack:
+        r, c = stack[-1]
+        y, x = wall + r * cell, wall + c * cell
+        border[y:y + cell - wall, x:x + cell - wall] = False
+        options = [(r + dr, c + dc) for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                   if 0 <= r + dr < rows and 0 <= c + dc < columns and not visited[r + dr, c + dc]]
+        if not options:
+            stack.pop()
+            continue
+        nr, nc = options[rng.integers(len(options))]
+        visited[nr, nc] = True
+        # проход между клетками
+        y0, y1 = sorted((y, wall + nr * cell))
+        x0, x1 = sorted((x, wall + nc * cell))
+        border[y0:y1 + cell - wall, x0:x1 + cell - wall] = False
+        stack.append((nr, nc))
+    return border, (wall + (cell - wall) // 2, wall + (cell - wall) // 2)
+
+
+# Квадратная спираль: один коридор шириной gap от края к центру
+def spiral(height, width, gap=4, wall=2):
+    border = np.zeros((height, width), dtype=bool)
+    top, left, bottom, right = 0, 0, height - 1, width - 1
+    step = gap + wall
+    while bottom - top > 2 * step and right - left > 2 * step:
+        border[top:top + wall, left:right + 1] = True
+        border[top:bottom + 1, right - wall + 1:right + 1] = True
+        border[bottom - wall + 1:bottom + 1, left:right + 1] = True
+        border[top + step:bottom + 1, left:left + wall] = True
+        top, left, bottom, right = top + step, left + step, bottom - step, right - step
+    return border, (wall + gap // 2, wall + gap // 2)
+
+
+# Шахматка: чёрные клетки - граница, белые соприкасаются только углами,
+# так что каждая белая клетка - отдельная область
+def checkerboard(height, width, square=16):
+    y, x = np.ogrid[:height, :width]
+    border = (y // square + x // square) % 2 == 1
+    return border, (square // 2, square // 2)
+
+
+# Большая открытая область: кольцо толщиной 3 пикселя, щёлкаем снаружи
+def open_region(height, width):
+    y, x = np.ogrid[:height, :width]
+    distance = np.hypot((y - height / 2) / (height / 3), (x - width / 2) / (width / 3))
+    border = np.abs(distance - 1) * min(height, width) / 3 < 1.5
+    return border, (1, height // 2)
+
+
+CANVASES = {
+    'maze': maze,
+    'spiral': spiral,
+    'checkerboard': checkerboard,
+    'open': open_region,
+}
+
+
+def to_canvas(border):
+    canvas = TiledCanvas(border.shape[1], border.shape[0])
+    canvas.write(0, 0, np.where(border, np.uint32(BLACK), np.uint32(WHITE)))
+    return canvas
+
+
+# эталон заливки: cv2.floodFill (4-связность) по маске
+def fill_reference(border, x, y):
+    height, width = border.shape
+    mask = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    cv2.floodFill(border.astype(np.uint8), mask, (x, y), 1, 0, 0, 4 | cv2.FLOODFILL_MASK_ONLY | (1 << 8))
+    return mask[1:-1, 1:-1].astype(bool)
+
+
+# эталон обхода: исходный обход с проверкой восьми соседей по одному
+def trace_reference(border, start_x, start_y):
+    height, width = border.shape
+    x = start_x
+    while 0 <= x < width:
+        if border[start_y, x]:
+            break
+        x += 1
+    else:
+        return None
+
+    start = (x, start_y)
+    points = [start]
+    current = start
+    prev_dir = 6
+    while True:
+        found = False
+        for i in range(8):
+            new_dir = (prev_dir - 2 + i) % 8
+            dx, dy = DIRECTIONS[new_dir]
+            nx, ny = current[0] + dx, current[1] + dy
+            if 0 <= nx < width and 0 <= ny < height and border[ny, nx]:
+                points.append((nx, ny))
+                if (nx, ny) == start:
+                    return points
+                current = (nx, ny)
+                prev_dir = new_dir
+                found = True
+                break
+        if not found:
+            return points
+
+
+# полупрозрачный паттерн RGBA, размер не кратен плитке
+def make_pattern(height=24, width=17, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 4), dtype=np.uint8)
+
+
+# эталон заливки цветом: весь холст массивом
+def fill_pixels(border, mask, color):
+    pixels = np.where(border, np.uint32(BLACK), np.uint32(WHITE))
+    pixels[mask] = color
+    return pixels
+
+
+# эталон заливки паттерном: паттерн от точки щелчка на весь холст и смешивание по альфе
+def pattern_pixels(border, mask, pattern, x, y):
+    height, width = border.shape
+    tiled = pattern[np.ix_((np.arange(height) - y) % pattern.shape[0], (np.arange(width) - x) % pattern.shape[1])]
+    alpha = tiled[:, :, 3:].astype(np.float32) / 255
+    base = np.where(border, 0, 255).astype(np.uint8)[:, :, np.newaxis]
+    rgb = (tiled[:, :, :3] * alpha + base * (1 - alpha)).astype(np.uint8).astype(np.uint32)
+    pixels = np.where(border, np.uint32(BLACK), np.uint32(WHITE))
+    pixels[mask] = (0xff000000 | rgb[:, :, 0] << 16 | rgb[:, :, 1] << 8 | rgb[:, :, 2])[mask]
+    return pixels
+
+
+def fill_scanline(border, canvas, x, y):
+    return spans_to_mask(flood_spans(~border, x, y), border.shape)
+
+
+def build_index(border, canvas, x, y):
+    return RegionIndex(~border)
+
+
+def fill_from_index(index, border, x, y):
+    y0, x0, mask = index.region(x, y)
+    full = np.zeros(border.shape, dtype=bool)
+    full[y0:y0 + mask.shape[0], x0:x0 + mask.shape[1]] = mask
+    return full
+
+
+def fill_tiles(regions, canvas, x, y):
+    full = np.zeros((canvas.height, canvas.width), dtype=bool)
+    for key, mask in regions.region(x, y).items():
+        y0, y1, x0, x1 = canvas.tile_rect(key)
+        full[y0:y1, x0:x1] = True if mask is None else mask
+    return full
+
+
+def trace_dense(border, canvas, x, y):
+    x = int(np.argmax(border[y, x:])) + x
+    return trace_mask(border, x, y)
+
+
+def trace_tiles(border, canvas, x, y):
+    x = find_right(canvas, x, y, BLACK)
+    return trace_moore(CanvasCodes(canvas, BLACK).at, x, y)
+
+
+# Заливка в виджете редактора - как по щелчку: поиск области, запись плиток и история.
+# Перед каждым запуском (вне замера) предыдущая заливка отменяется и разметка
+# обновляется, так что меряется щелчок по уже размеченному холсту.
+def widget_reset(widget):
+    widget.history.undo(widget.canvas)
+    widget.regions.refresh()
+
+
+def widget_pixels(widget):
+    return widget.canvas.read(0, widget.canvas.height, 0, widget.canvas.width)
+
+
+# время (без tracemalloc) и пиковая память (отдельным запуском) вызова function();
+# setup() вызывается перед каждым запуском и не меряется
+def measure(function, setup=None):
+    if setup is not None:
+        setup()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def report(name, elapsed, peak, pixels, same):
+    rate = pixels / elapsed if elapsed else float('inf')
+    print(f"  {name:<22} {elapsed * 1000:>9.1f} мс {rate / 1e6:>9.2f} Мпикс/с {peak / 1e6:>8.1f} МБ"
+          f"  {'совпадает' if same else 'ОТЛИЧАЕТСЯ'}")
+
+
+def bench(name, height, width):
+    border, (x, y) = CANVASES[name](height, width)
+    canvas = to_canvas(border)
+    print(f"{name} {width}x{height}")
+
+    reference = fill_reference(border, x, y)
+    pixels = int(reference.sum())
+    print(f"  заливка: {pixels} пикселей")
+    mask, elapsed, peak = measure(lambda: fill_scanline(border, canvas, x, y))
+    report('scanline', elapsed, peak, pixels, np.array_equal(mask, reference))
+    index, elapsed, peak = measure(lambda: build_index(border, canvas, x, y))
+    report('разметка: построение', elapsed, peak, border.size, np.array_equal(index.labels > 0, ~border))
+    mask, elapsed, peak = measure(lambda: fill_from_index(index, border, x, y))
+    report('разметка: поиск', elapsed, peak, pixels, np.array_equal(mask, reference))
+    # первый раз плитки размечаются, дальше разметка берётся из кэша
+    mask, elapsed, peak = measure(lambda: fill_tiles(TileRegions(canvas, BLACK), canvas, x, y))
+    report('плитки: первый раз', elapsed, peak, pixels, np.array_equal(mask, reference))
+    regions = TileRegions(canvas, BLACK)
+    fill_tiles(regions, canvas, x, y)
+    mask, elapsed, peak = measure(lambda: fill_tiles(regions, canvas, x, y))
+    report('плитки: с разметкой', elapsed, peak, pixels, np.array_equal(mask, reference))
+
+    widget = DrawingWidget(None, width, height)
+    for key, tile in canvas.tiles.items():
+        widget.canvas.put(key, tile)
+    _, elapsed, peak = measure(lambda: widget.flood_fill_line_by_line(x, y, QColor(RED)), lambda: widget_reset(widget))
+    report('виджет: цвет', elapsed, peak, pixels,
+           np.array_equal(widget_pixels(widget), fill_pixels(border, reference, RED)))
+    pattern = make_pattern()
+    _, elapsed, peak = measure(lambda: widget.flood_fill_with_pattern(x, y, pattern, (x, y)), lambda: widget_reset(widget))
+    report('виджет: паттерн', elapsed, peak, pixels,
+           np.array_equal(widget_pixels(widget), pattern_pixels(border, reference, pattern, x, y)))
+
+    reference = trace_reference(border, x, y)
+    if reference is None:
+        print("  граница: справа от точки границы нет")
+        return
+    print(f"  граница: {len(reference)} точек")
+    for trace_name, trace in (('маска', trace_dense), ('плитки', trace_tiles)):
+        points, elapsed, peak = measure(lambda: trace(border, canvas, x, y))
+        report(trace_name, elapsed, peak, len(reference), points == reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры заливки и обхода границы")
+    parser.add_argument('--sizes', nargs='+', default=SIZES, help="размеры ШИРИНАxВЫСОТА")
+    parser.add_argument('--canvases', nargs='+', default=list(CANVASES), choices=list(CANVASES))
+    args = parser.parse_args()
+    # без QApplication виджет не создать; держим ссылку до конца замеров
+    app = QApplication([])
+
+    for size in args.sizes:
+        width, height = map(int, size.split('x'))
+        for name in args.canvases:
+            bench(name, height, width)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import numpy as np
+from canvas import TILE
+
+'''
+Обход границы (Moore-neighbour tracing) по булевой маске границы.
+Для каждого пикселя заранее (NumPy, без цикла) считается 8-битный код соседей:
+бит d установлен, если сосед в направлении DIRECTIONS[d] - граница.
+Тогда шаг обхода - это поиск в таблице NEXT_DIRECTION[код][предыдущее направление],
+без проверки восьми соседей по одному.
+Результат упрощается алгоритмом Дугласа - Пекера.
+'''
+
+DIRECTIONS = [
+    (1, 0), # вправо
+    (1, -1), # вправо-вверх
+    (0, -1), # вверх
+    (-1, -1), # влево-вверх
+    (-1, 0), # влево
+    (-1, 1), # влево-вниз
+    (0, 1), # вниз
+    (1, 1) # вправо-вниз
+]
+
+
+# следующее направление: первый сосед-граница, начиная с (prev - 2) по кругу, или -1
+def _next_direction(code, prev):
+    for i in range(8):
+        direction = (prev - 2 + i) % 8
+        if code >> direction & 1:
+            return direction
+    return -1
+
+
+NEXT_DIRECTION = [[_next_direction(code, prev) for prev in range(8)] for code in range(256)]
+
+
+# Коды соседей для маски с полем в 1 пиксель: результат на 2 меньше по каждой оси.
+def neighbour_codes(padded):
+    height, width = padded.shape[0] - 2, padded.shape[1] - 2
+    codes = np.zeros((height, width), dtype=np.uint8)
+    for bit, (dx, dy) in enumerate(DIRECTIONS):
+        codes |= padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width].astype(np.uint8) << bit
+    return codes
+
+
+# Обход от точки границы (x, y); code_at(x, y) - код соседей пикселя.
+# Как и раньше, начинаем в направлении вниз и заканчиваем, вернувшись в начальную точку.
+# Если обход зациклился, не дойдя до неё, - тоже заканчиваем.
+def trace_moore(code_at, x, y):
+    start = (x, y)
+    points = [start]
+    direction = 6
+    visited = set()
+    while True:
+        direction = NEXT_DIRECTION[code_at(x, y)][direction]
+        if direction < 0:
+            break
+        dx, dy = DIRECTIONS[direction]
+        x, y = x + dx, y + dy
+        points.append((x, y))
+        if (x, y) == start:
+            break
+        state = (x, y, direction)
+        if state in visited:
+            break
+        visited.add(state)
+    return points
+
+
+# обход по обычной маске границы (h, w)
+def trace_mask(mask, x, y):
+    codes = neighbour_codes(np.pad(mask, 1))
+    return trace_moore(lambda x, y: codes[y, x], x, y)
+
+
+# Коды соседей на плиточном холсте: считаются по плитке с полем в 1 пиксель,
+# только для плиток, через которые проходит обход.
+class CanvasCodes:
+    def __init__(self, canvas, border):
+        self.canvas = canvas
+        self.border = border
+        self.tiles = {}
+
+    def at(self, x, y):
+        key = (y // TILE, x // TILE)
+        codes = self.tiles.get(key)
+        if codes is None:
+            y0, y1, x0, x1 = self.canvas.tile_rect(key)
+            codes = neighbour_codes(self.canvas.read(y0 - 1, y1 + 1, x0 - 1, x1 + 1) == self.border)
+            self.tiles[key] = codes
+        return codes[y % TILE, x % TILE]
+
+
+# ближайший пиксель границы справа от (x, y) в той же строке холста или None
+def find_right(canvas, x, y, border):
+    ty = y // TILE
+    for tx in range(x // TILE, canvas.columns):
+        x0 = tx * TILE
+        tile = canvas.get((ty, tx))
+        offset = max(x - x0, 0)
+        if isinstance(tile, np.ndarray):
+            hits = np.flatnonzero(tile[y - ty * TILE, offset:] == border)
+            if len(hits):
+                return x0 + offset + int(hits[0])
+        elif tile == border:
+            return x0 + offset
+    return None
+
+
+# Упрощение ломаной (Дуглас - Пекер): оставляем точки, отстоящие от хорды дальше tolerance.
+# points - массив (n, 2); возвращает оставленные точки. Без рекурсии, расстояния - NumPy.
+def simplify(points, tolerance):
+    if tolerance <= 0 or len(points) < 3:
+        return points
+    points = np.asarray(points, dtype=np.float64)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = points[first], points[last]
+        inner = points[first + 1:last]
+        chord = b - a
+        length = np.hypot(*chord)
+        if length == 0:
+            # замкнутый контур: хорда вырождается в точку
+            distances = np.hypot(*(inner - a).T)
+        else:
+            distances = np.abs(chord[0] * (inner[:, 1] - a[1]) - chord[1] * (inner[:, 0] - a[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack.append((first, middle))
+            stack.append((middle, last))
+    return points[keep]
@@ -0,0 +1,125 @@
+import numpy as np
+
+'''
+Разреженный холст из плиток TILE x TILE (пиксели RGB32, 0xffRRGGBB).
+Плитка хранится как:
+    - отсутствует в словаре - вся плитка цвета фона (пустая, память не занимает);
+    - int - вся плитка одного цвета (например, целиком залитая);
+    - массив uint32 - плитка с рисунком. У крайних плиток форма обрезана по холсту.
+Массивы плиток не меняются на месте (writeable = False): запись создаёт новую плитку.
+Благодаря этому история отмены хранит старые плитки просто ссылками, а разметка
+областей понимает, что плитка не изменилась, сравнив объект.
+Память растёт с нарисованным, а не с размером холста.
+Кэши поверх холста (разметка областей) подписываются через watch() и получают
+ключи плиток, которые клались заново, чтобы не перебирать весь холст.
+'''
+
+TILE = 64
+WHITE = 0xffffffff
+
+
+class TiledCanvas:
+    def __init__(self, width, height, background=WHITE):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.rows = (height + TILE - 1) // TILE
+        self.columns = (width + TILE - 1) // TILE
+        self.tiles = {}
+        # множества ключей изменённых плиток для подписчиков; None в множестве - изменён весь холст
+        self.watchers = []
+
+    # Подписка на изменения: возвращает множество, в которое холст добавляет ключи плиток,
+    # положенных через put, и None при очистке. Подписчик сам очищает его, когда обработал.
+    def watch(self):
+        changed = set()
+        self.watchers.append(changed)
+        return changed
+
+    # прямоугольник плитки на холсте [y0, y1) x [x0, x1)
+    def tile_rect(self, key):
+        ty, tx = key
+        return ty * TILE, min((ty + 1) * TILE, self.height), tx * TILE, min((tx + 1) * TILE, self.width)
+
+    # ключи плиток, пересекающих прямоугольник [y0, y1) x [x0, x1)
+    def keys_in(self, y0, y1, x0, x1):
+        y0, y1 = max(y0, 0), min(y1, self.height)
+        x0, x1 = max(x0, 0), min(x1, self.width)
+        if y0 >= y1 or x0 >= x1:
+            return []
+        return [(ty, tx) for ty in range(y0 // TILE, (y1 - 1) // TILE + 1)
+                for tx in range(x0 // TILE, (x1 - 1) // TILE + 1)]
+
+    # плитка как есть: массив или цвет
+    def get(self, key):
+        return self.tiles.get(key, self.background)
+
+    # плитка как массив (для одноцветной создаётся новый)
+    def dense(self, key):
+        tile = self.get(key)
+        if isinstance(tile, np.ndarray):
+            return tile
+        y0, y1, x0, x1 = self.tile_rect(key)
+        return np.full((y1 - y0, x1 - x0), tile, dtype=np.uint32)
+
+    # Кладёт плитку (массив, цвет или None - фон). Одноцветный массив хранится как цвет.
+    def put(self, key, tile):
+        for changed in self.watchers:
+            changed.add(key)
+        if isinstance(tile, np.ndarray):
+            first = int(tile.flat[0])
+            if not (tile == first).all():
+                tile.flags.writeable = False
+                self.tiles[key] = tile
+                return
+            tile = first
+        if tile is None or tile == self.background:
+            self.tiles.pop(key, None)
+        else:
+            self.tiles[key] = tile
+
+    def pixel(self, x, y):
+        tile = self.get((y // TILE, x // TILE))
+        if isinstance(tile, np.ndarray):
+            return tile[y % TILE, x % TILE]
+        return tile
+
+    # копия прямоугольника холста как обычный массив
+    def read(self, y0, y1, x0, x1):
+        out = np.full((y1 - y0, x1 - x0), self.background, dtype=np.uint32)
+        for key in self.keys_in(y0, y1, x0, x1):
+            ty0, ty1, tx0, tx1 = self.tile_rect(key)
+            cy0, cy1, cx0, cx1 = max(ty0, y0), min(ty1, y1), max(tx0, x0), min(tx1, x1)
+            tile = self.get(key)
+            if isinstance(tile, np.ndarray):
+                tile = tile[cy0 - ty0:cy1 - ty0, cx0 - tx0:cx1 - tx0]
+            out[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0] = tile
+        return out
+
+    # Записывает массив values в прямоугольник с началом (y0, x0).
+    # Плитки, содержимое которых не изменилось, остаются прежними объектами.
+    # Возвращает ключи изменённых плиток.
+    def write(self, y0, x0, values):
+        y1, x1 = y0 + values.shape[0], x0 + values.shape[1]
+        changed = []
+        for key in self.keys_in(y0, y1, x0, x1):
+            ty0, ty1, tx0, tx1 = self.tile_rect(key)
+            cy0, cy1, cx0, cx1 = max(ty0, y0), min(ty1, y1), max(tx0, x0), min(tx1, x1)
+            block = values[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+            old = self.dense(key)
+            if np.array_equal(old[cy0 - ty0:cy1 - ty0, cx0 - tx0:cx1 - tx0], block):
+                continue
+            tile = old.copy()
+            tile[cy0 - ty0:cy1 - ty0, cx0 - tx0:cx1 - tx0] = block
+            self.put(key, tile)
+            changed.append(key)
+        return changed
+
+    def clear(self):
+        self.tiles.clear()
+        for changed in self.watchers:
+            changed.add(None)
+
+    # память под плитки с рисунком
+    def nbytes(self):
+        return sum(tile.nbytes for tile in self.tiles.values() if isinstance(tile, np.ndarray))
@@ -0,0 +1,60 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+# Редактор этот модуль больше не использует (заливка идёт по разметке regions.TileRegions);
+# он оставлен как эталон для сравнения в bench_fill.
+
+# Построчная (scanline) заливка без рекурсии.
+# passable - булев массив (h, w): True там, где можно заливать (не граница).
+# Отрезок заливки - это всегда целый непрерывный кусок (run) проходимых пикселей строки,
+# поэтому куски всех строк находятся заранее (перепады в строке, как в regions.label_components),
+# а из отрезка в стек кладутся перекрывающиеся с ним куски строк выше и ниже.
+# Их ищем двоичным поиском по ключу y * stride + x, так что отрезок стоит
+# O(log кусков + соседей), а не O(ширины строки).
+# Возвращает список отрезков (y, left, right) - пиксели [left, right) строки y.
+def flood_spans(passable, x, y):
+    height, width = passable.shape
+    if not passable[y, x]:
+        return []
+    stride = width + 2
+
+    padded = np.zeros((height, stride), dtype=np.int8)
+    padded[:, 1:-1] = passable
+    steps = np.diff(padded, axis=1)
+    run_y, run_start = np.nonzero(steps == 1)
+    run_end = np.nonzero(steps == -1)[1]
+    # списки Python: bisect по ним быстрее, чем searchsorted на каждый отрезок
+    start_key = (run_y * stride + run_start).tolist()
+    end_key = (run_y * stride + run_end).tolist()
+    run_y, run_start, run_end = run_y.tolist(), run_start.tolist(), run_end.tolist()
+
+    first = bisect_right(start_key, y * stride + x) - 1
+    visited = [False] * len(start_key)
+    visited[first] = True
+    stack = [first]
+    spans = []
+
+    while stack:
+        run = stack.pop()
+        y, left, right = run_y[run], run_start[run], run_end[run]
+        spans.append((y, left, right))
+
+        for ny in (y - 1, y + 1):
+            if 0 <= ny < height:
+                # куски строки ny с end > left и start < right
+                lo = bisect_right(end_key, ny * stride + left)
+                hi = bisect_left(start_key, ny * stride + right)
+                for other in range(lo, hi):
+                    if not visited[other]:
+                        visited[other] = True
+                        stack.append(other)
+
+    return spans
+
+
+# Булева маска области из отрезков flood_spans
+def spans_to_mask(spans, shape):
+    mask = np.zeros(shape, dtype=bool)
+    for y, left, right in spans:
+        mask[y, left:right] = True
+    return mask
@@ -0,0 +1,89 @@
+from collections import deque
+import numpy as np
+
+'''
+История отмены/повтора для плиточного холста (см. canvas.TiledCanvas).
+Перед первой записью в плитку в рамках действия (штрих, заливка, очистка)
+запоминается её прежнее состояние. Холст не меняет плитки на месте, поэтому
+это просто ссылка на старую плитку (copy-on-write без копирования), остальные
+плитки не трогаются. Отмена и повтор меняют местами сохранённые и текущие плитки,
+то есть стоят O(изменённых плиток), а память растёт с площадью правок, а не с числом действий.
+При превышении бюджета выбрасываются самые старые действия.
+'''
+
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+
+# плитка не менялась: тот же массив (холст не меняет их на месте) или тот же цвет
+def _same_tile(old, new):
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return old is new
+    return old == new
+
+
+def _action_bytes(action):
+    return sum(tile.nbytes for tile in action.values() if isinstance(tile, np.ndarray))
+
+
+class TileHistory:
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.undo_stack = deque()
+        self.redo_stack = []
+        # текущее действие: (ряд плитки, столбец плитки) -> плитка до изменения
+        self.pending = {}
+
+    # Запоминает плитки keys перед записью в них (если в этом действии ещё не запомнены).
+    def touch(self, canvas, keys):
+        for key in keys:
+            if key not in self.pending:
+                self.pending[key] = canvas.get(key)
+
+    # Завершает действие. Новое действие обнуляет историю повтора.
+    # touch() могли вызвать с запасом (штрих отмечает плитки с полем вокруг линии),
+    # поэтому плитки, которые в итоге не изменились, в действие не попадают.
+    def commit(self, canvas):
+        self.pending = {key: old for key, old in self.pending.items() if not _same_tile(old, canvas.get(key))}
+        if not self.pending:
+            return
+        self.undo_stack.append(self.pending)
+        self.used_bytes += _action_bytes(self.pending)
+        self.pending = {}
+        for action in self.redo_stack:
+            self.used_bytes -= _action_bytes(action)
+        self.redo_stack.clear()
+
+        while self.used_bytes > self.budget_bytes and len(self.undo_stack) > 1:
+            self.used_bytes -= _action_bytes(self.undo_stack.popleft())
+
+    # меняет местами сохранённые плитки и текущие, возвращает плитки для обратного действия
+    def swap(self, canvas, action):
+        reverse = {}
+        for key, tile in action.items():
+            reverse[key] = canvas.get(key)
+            canvas.put(key, tile)
+        self.used_bytes += _action_bytes(reverse) - _action_bytes(action)
+        return reverse
+
+    # Отмена и повтор возвращают список изменённых плиток (ряд, столбец) или None, если нечего делать
+    def undo(self, canvas):
+        self.commit(canvas)
+        if not self.undo_stack:
+            return None
+        action = self.undo_stack.pop()
+        self.redo_stack.append(self.swap(canvas, action))
+        return list(action)
+
+    def redo(self, canvas):
+        if not self.redo_stack:
+            return None
+        action = self.redo_stack.pop()
+        self.undo_stack.append(self.swap(canvas, action))
+        return list(action)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.pending = {}
+        self.used_bytes = 0
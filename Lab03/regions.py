@@ -0,0 +1,251 @@
+import numpy as np
+from canvas import TILE
+
+# Объединение (union-find) count узлов по рёбрам pair_a[i] - pair_b[i], без цикла по рёбрам:
+# подвешиваем корни к меньшему номеру и сжимаем пути, пока пары не совпадут.
+# Возвращает для каждого узла корень - наименьший номер узла в его компоненте.
+def union_roots(count, pair_a, pair_b):
+    parent = np.arange(count)
+    while len(pair_a):
+        root_a, root_b = parent[pair_a], parent[pair_b]
+        different = root_a != root_b
+        if not different.any():
+            break
+        root_a, root_b = root_a[different], root_b[different]
+        smaller = np.minimum(root_a, root_b)
+        np.minimum.at(parent, root_a, smaller)
+        np.minimum.at(parent, root_b, smaller)
+        while True:
+            jumped = parent[parent]
+            if (jumped == parent).all():
+                break
+            parent = jumped
+    return parent
+
+
+# Разметка связных областей (4-связность) проходимых пикселей.
+# Строка разбивается на непрерывные отрезки (runs), отрезки соседних строк,
+# которые перекрываются, объединяются в одну область.
+# Возвращает (labels, boxes): labels - int32 (h, w), 0 - граница, иначе номер области 1..n;
+# boxes - (n + 1, 4) с описанным прямоугольником каждой области [y0, y1, x0, x1).
+def label_components(passable):
+    height, width = passable.shape
+    stride = width + 2
+
+    # начала и концы отрезков: перепады 0 -> 1 и 1 -> 0 в строке с добавленными нулями по краям
+    padded = np.zeros((height, stride), dtype=np.int8)
+    padded[:, 1:-1] = passable
+    steps = np.diff(padded, axis=1)
+    run_y, run_start = np.nonzero(steps == 1)
+    run_end = np.nonzero(steps == -1)[1]
+    count = len(run_y)
+    if count == 0:
+        return np.zeros((height, width), dtype=np.int32), np.zeros((1, 4), dtype=np.int64)
+
+    # для отрезка b в строке y ищем отрезки a строки y - 1 с a.end > b.start и a.start < b.end.
+    # ключ y * stride + x упорядочен так же, как отрезки, поэтому хватает searchsorted
+    start_key = run_y * stride + run_start
+    end_key = run_y * stride + run_end
+    has_prev = run_y > 0
+    below = np.flatnonzero(has_prev)
+    lo = np.searchsorted(end_key, (run_y[below] - 1) * stride + run_start[below], side='right')
+    hi = np.searchsorted(start_key, (run_y[below] - 1) * stride + run_end[below], side='left')
+    overlaps = np.maximum(hi - lo, 0)
+    pair_b = np.repeat(below, overlaps)
+    group_start = np.repeat(np.cumsum(overlaps) - overlaps, overlaps)
+    pair_a = np.repeat(lo, overlaps) + np.arange(len(pair_b)) - group_start
+
+    # номера областей 1..n
+    _, run_label = np.unique(union_roots(count, pair_a, pair_b), return_inverse=True)
+    run_label = (run_label + 1).astype(np.int32)
+    regions = int(run_label.max())
+
+    # рисуем отрезки: +номер в начале, -номер в конце и накопленная сумма по строке
+    steps = np.zeros((height, width + 1), dtype=np.int32)
+    steps[run_y, run_start] = run_label
+    steps[run_y, run_end] -= run_label
+    labels = np.cumsum(steps, axis=1, dtype=np.int32)[:, :width]
+
+    boxes = np.zeros((regions + 1, 4), dtype=np.int64)
+    boxes[1:, 0] = height
+    boxes[1:, 2] = width
+    np.minimum.at(boxes[:, 0], run_label, run_y)
+    np.maximum.at(boxes[:, 1], run_label, run_y + 1)
+    np.minimum.at(boxes[:, 2], run_label, run_start)
+    np.maximum.at(boxes[:, 3], run_label, run_end)
+    return labels, boxes
+
+
+# Индекс областей целого холста-массива: заливка - это поиск номера области под курсором.
+# Редактор работает с TileRegions, этот класс остался для сравнения в bench_fill.
+class RegionIndex:
+    def __init__(self, passable):
+        self.labels, self.boxes = label_components(passable)
+
+    # (y0, x0, маска области в её прямоугольнике) или None, если щёлкнули по границе
+    def region(self, x, y):
+        label = self.labels[y, x]
+        if label == 0:
+            return None
+        y0, y1, x0, x1 = self.boxes[label]
+        return y0, x0, self.labels[y0:y1, x0:x1] == label
+
+
+# Разметка областей на плиточном холсте (canvas.TiledCanvas).
+# Узлы - области внутри плиток: у плитки с рисунком это её локальные области
+# (label_components, кэш по объекту плитки), одноцветная проходимая плитка (в том числе
+# пустая) - один узел, плитка цвета границы узлов не имеет. Узлы соседних плиток,
+# соприкасающиеся по общему краю, объединяются (union_roots) в общие области холста.
+# Холст сообщает, какие плитки клались заново (canvas.watch), поэтому после правки
+# заново размечаются и сшиваются по краям только они, а щелчок без правок - это поиск
+# готовой области по номеру узла.
+class TileRegions:
+    def __init__(self, canvas, border):
+        self.canvas = canvas
+        self.border = border
+        self.changed = canvas.watch()
+        # ключ плитки с рисунком -> (плитка, разметка)
+        self.local = {}
+        # (ключ плитки, ось соседа: 0 - снизу, 1 - справа) -> пары соприкасающихся локальных номеров (m, 2)
+        self.edges = {}
+        # сетки плиток: число узлов и признак плитки с рисунком
+        self.counts = None
+        self.mixed = None
+        # общие области: корень узла и узлы, упорядоченные по области
+        self.roots = None
+        # последняя найденная область: (корень, маски); сбрасывается при правке холста
+        self.last = None
+
+    # число узлов одноцветной плитки
+    def solid_count(self, tile):
+        return int(tile != self.border)
+
+    # разметка плитки key, как будто она с рисунком: у одноцветной - 1 или 0 везде
+    def labels(self, key):
+        if self.mixed[key]:
+            return self.local[key][1]
+        y0, y1, x0, x1 = self.canvas.tile_rect(key)
+        return np.full((y1 - y0, x1 - x0), self.counts[key], dtype=np.int32)
+
+    # пары соприкасающихся локальных номеров плитки key и её соседа снизу (axis = 0) или справа (1)
+    def edge(self, key, axis):
+        cached = self.edges.get((key, axis))
+        if cached is None:
+            other = (key[0] + 1, key[1]) if axis == 0 else (key[0], key[1] + 1)
+            if axis == 0:
+                mine, theirs = self.labels(key)[-1], self.labels(other)[0]
+            else:
+                mine, theirs = self.labels(key)[:, -1], self.labels(other)[:, 0]
+            touching = (mine > 0) & (theirs > 0)
+            cached = np.unique(np.stack((mine[touching], theirs[touching]), axis=1), axis=0)
+            self.edges[key, axis] = cached
+        return cached
+
+    # плитка key положена заново: разметка и края с соседями устарели, если сменился объект
+    def retile(self, key):
+        tile = self.canvas.get(key)
+        cached = self.local.get(key)
+        if cached is not None and cached[0] is tile:
+            return
+        if isinstance(tile, np.ndarray):
+            labels = label_components(tile != self.border)[0]
+            self.local[key] = (tile, labels)
+            self.counts[key] = labels.max()
+            self.mixed[key] = True
+        else:
+            if cached is None and not self.mixed[key] and self.counts[key] == self.solid_count(tile):
+                return
+            self.local.pop(key, None)
+            self.counts[key] = self.solid_count(tile)
+            self.mixed[key] = False
+        ty, tx = key
+        for edge_key in ((key, 0), (key, 1), ((ty - 1, tx), 0), ((ty, tx - 1), 1)):
+            self.edges.pop(edge_key, None)
+
+    # Обновляет разметку после правок холста; без правок ничего не делает
+    def refresh(self):
+        canvas = self.canvas
+        if self.roots is not None and not self.changed:
+            return
+        if self.roots is None or None in self.changed:
+            self.local.clear()
+            self.edges.clear()
+            self.counts = np.full((canvas.rows, canvas.columns), self.solid_count(canvas.background), dtype=np.int64)
+            self.mixed = np.zeros((canvas.rows, canvas.columns), dtype=bool)
+            changed = list(canvas.tiles)
+        else:
+            changed = self.changed
+        self.last = None
+        for key in changed:
+            if key is not None:
+                self.retile(key)
+        self.changed.clear()
+
+        # номера узлов: плитки по порядку, внутри плитки - по локальному номеру
+        counts = self.counts.ravel()
+        offsets = np.cumsum(counts) - counts
+        grid = offsets.reshape(self.counts.shape)
+        pair_a, pair_b = [], []
+        # одноцветные проходимые плитки рядом друг с другом - вся сетка сразу
+        solid = (self.counts == 1) & ~self.mixed
+        down = solid[:-1] & solid[1:]
+        right = solid[:, :-1] & solid[:, 1:]
+        pair_a += [grid[:-1][down], grid[:, :-1][right]]
+        pair_b += [grid[1:][down], grid[:, 1:][right]]
+        # края плиток с рисунком; край с соседом-плиткой с рисунком сверху или слева берёт сосед
+        for ty, tx in self.local:
+            for first, axis in (((ty, tx), 0), ((ty, tx), 1), ((ty - 1, tx), 0), ((ty, tx - 1), 1)):
+                second = (first[0] + 1, first[1]) if axis == 0 else (first[0], first[1] + 1)
+                if first[0] < 0 or first[1] < 0 or second[0] >= canvas.rows or second[1] >= canvas.columns:
+                    continue
+                if first != (ty, tx) and self.mixed[first]:
+                    continue
+                pairs = self.edge(first, axis)
+                pair_a.append(grid[first] + pairs[:, 0] - 1)
+                pair_b.append(grid[second] + pairs[:, 1] - 1)
+
+        total = int(counts.sum())
+        roots = union_roots(total, np.concatenate(pair_a), np.concatenate(pair_b))
+        self.roots = roots
+        self.order = np.argsort(roots, kind='stable')
+        self.sorted_roots = roots[self.order]
+        self.offsets = offsets
+        self.node_tile = np.repeat(np.arange(len(counts)), counts)
+        self.node_label = np.arange(total) - offsets[self.node_tile] + 1
+
+    # Область, содержащая точку (x, y): словарь ключ плитки -> булева маска в плитке
+    # или None, если область занимает плитку целиком. None вместо словаря - щелчок по границе.
+    def region(self, x, y):
+        self.refresh()
+        key = (y // TILE, x // TILE)
+        node = self.offsets[key[0] * self.canvas.columns + key[1]]
+        if self.mixed[key]:
+            label = int(self.local[key][1][y % TILE, x % TILE])
+            if label == 0:
+                return None
+            node += label - 1
+        elif self.counts[key] == 0:
+            return None
+
+        # узлы области идут подряд, а внутри неё - по плиткам
+        root = self.roots[node]
+        if self.last is not None and self.last[0] == root:
+            return self.last[1]
+        nodes = self.order[np.searchsorted(self.sorted_roots, root, 'left'):
+                           np.searchsorted(self.sorted_roots, root, 'right')]
+        tiles, starts = np.unique(self.node_tile[nodes], return_index=True)
+        labels = np.split(self.node_label[nodes], starts[1:])
+        masks = {}
+        for tile, tile_labels in zip(tiles.tolist(), labels):
+            key = divmod(tile, self.canvas.columns)
+            if self.mixed[key]:
+                # маска - выборка из таблицы «номер области в плитке -> входит ли в заливку»
+                chosen = np.zeros(self.counts[key] + 1, dtype=bool)
+                chosen[tile_labels] = True
+                masks[key] = chosen[self.local[key][1]]
+                # маски отдаются и при повторном щелчке, поэтому только для чтения
+                masks[key].flags.writeable = False
+            else:
+                masks[key] = None
+        self.last = (root, masks)
+        return masks
@@ -1,32 +1,65 @@
 import sys
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QRadioButton, QFileDialog, QColorDialog
+    QPushButton, QRadioButton, QFileDialog, QColorDialog, QScrollArea,
+    QLabel, QDoubleSpinBox
 )
 from PyQt6.QtGui import (
-    QPainter, QPen, QColor, QImage, QMouseEvent
+    QPainter, QPen, QColor, QImage, QMouseEvent, QKeySequence, QPainterPath
 )
-from PyQt6.QtCore import Qt, QPoint
+from PyQt6.QtCore import Qt, QPoint, QPointF, QRect, QTimer
+from PyQt6 import sip
 from PIL import Image
 import numpy as np
+from canvas import TiledCanvas, TILE
+from regions import TileRegions
+from history import TileHistory
+from border import CanvasCodes, find_right, trace_moore, simplify
+
+
+# QImage поверх массива uint32 (h, w) без копирования; массив должен жить, пока жив QImage
+def array_image(pixels):
+    height, width = pixels.shape
+    return QImage(sip.voidptr(pixels.ctypes.data), width, height, width * 4, QImage.Format.Format_RGB32)
 
 
 class DrawingWidget(QWidget):
-    def __init__(self, main_window):
+    def __init__(self, main_window, width=800, height=600):
         super().__init__()
         self.main_window = main_window
         self.setMouseTracking(True)
         self.drawing = False
         self.last_point = QPoint()
-        self.image = QImage(800, 600, QImage.Format.Format_RGB32)
-        self.image.fill(Qt.GlobalColor.white)
+        # холст из плиток: пустые плитки не хранятся, рисуются только видимые
+        self.canvas = TiledCanvas(width, height)
+        self.setFixedSize(width, height)
         self.border_color = QColor(Qt.GlobalColor.black)
         self.pen_width = 5
 
         self.fill_color = QColor(Qt.GlobalColor.red)
         self.pattern_image = None
         self.pattern_array = None
-        self.border_points = []
+        # найденная граница: точки обхода (n, 2), упрощённые с допуском border_tolerance
+        # и готовый QPainterPath, который просто рисуется при перерисовке
+        self.border_points = np.zeros((0, 2), dtype=np.int64)
+        self.border_tolerance = 1.0
+        self.border_path = QPainterPath()
+
+        # разметка областей для заливки: плитка размечается заново, только если изменилась
+        self.regions = TileRegions(self.canvas, self.border_color.rgb())
+        # отмена/повтор: храним только изменённые плитки
+        self.history = TileHistory()
+
+        # штрих копится в путь и рисуется вместе с перерисовкой повреждённой области
+        # один раз за проход цикла событий (flush)
+        self.stroke_path = QPainterPath()
+        self.pending_rect = QRect()
+        self.pending_tiles = set()
+        self.dirty_rect = QRect()
+        self.flush_scheduled = False
+        # для профилирования: сколько раз перерисовывали и сколько пикселей
+        self.repaint_count = 0
+        self.repaint_area = 0
 
     def mousePressEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -39,32 +72,147 @@ class DrawingWidget(QWidget):
 
     def mouseMoveEvent(self, event: QMouseEvent):
         if self.drawing and self.main_window.mode == "draw":
-            painter = QPainter(self.image)
-            pen = QPen(self.border_color, self.pen_width, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap)
-            painter.setPen(pen)
-            painter.drawLine(self.last_point, event.pos())
+            if self.stroke_path.isEmpty():
+                self.stroke_path.moveTo(QPointF(self.last_point))
+            self.stroke_path.lineTo(QPointF(event.pos()))
+            margin = self.pen_width
+            segment = QRect(self.last_point, event.pos()).normalized().adjusted(-margin, -margin, margin, margin)
+            self.pending_rect = self.pending_rect.united(segment)
+            self.pending_tiles.update(self.segment_tiles(self.last_point, event.pos()))
             self.last_point = event.pos()
-            self.update()
+            self.schedule_flush()
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton:
+            if self.drawing:
+                self.flush()
+                self.history.commit(self.canvas)
             self.drawing = False
         super().mouseReleaseEvent(event)
 
     def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.drawImage(0, 0, self.image)
+        rect = event.rect()
+        self.repaint_count += 1
+        self.repaint_area += rect.width() * rect.height()
 
-        if self.border_points:
+        # только плитки, попавшие в перерисовываемую (видимую) часть
+        painter = QPainter(self)
+        painter.fillRect(rect, QColor.fromRgb(self.canvas.background))
+        for key in self.canvas.keys_in(rect.top(), rect.bottom() + 1, rect.left(), rect.right() + 1):
+            tile = self.canvas.tiles.get(key)
+            if tile is None:
+                continue
+            y0, y1, x0, x1 = self.canvas.tile_rect(key)
+            if isinstance(tile, np.ndarray):
+                painter.drawImage(x0, y0, array_image(tile))
+            else:
+                painter.fillRect(x0, y0, x1 - x0, y1 - y0, QColor.fromRgb(tile))
+
+        if not self.border_path.isEmpty():
             pen = QPen(QColor(255, 0, 0), 3)
             painter.setPen(pen)
-            for i in range(len(self.border_points) - 1):
-                painter.drawLine(self.border_points[i], self.border_points[i + 1])
+            painter.drawPath(self.border_path)
+
+    # область для перерисовки; сама перерисовка - в flush, один раз за проход цикла событий
+    def mark_dirty(self, rect):
+        self.dirty_rect = self.dirty_rect.united(rect)
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            QTimer.singleShot(0, self.flush)
+
+    # дорисовывает накопленный штрих одним QPainter и перерисовывает объединение повреждённых областей
+    def flush(self):
+        self.flush_scheduled = False
+        if not self.stroke_path.isEmpty():
+            # путь рисуем в копию каждой задетой плитки и кладём её обратно
+            pen = QPen(self.border_color, self.pen_width, Qt.PenStyle.SolidLine,
+                       Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin)
+            keys = sorted(self.pending_tiles)
+            self.history.touch(self.canvas, keys)
+            for key in keys:
+                y0, y1, x0, x1 = self.canvas.tile_rect(key)
+                window = self.canvas.dense(key).copy()
+                image = array_image(window)
+                painter = QPainter(image)
+                painter.translate(-x0, -y0)
+                painter.setPen(pen)
+                painter.drawPath(self.stroke_path)
+                painter.end()
+                self.canvas.write(y0, x0, window)
+            self.dirty_rect = self.dirty_rect.united(self.pending_rect)
+        self.stroke_path = QPainterPath()
+        self.pending_rect = QRect()
+        self.pending_tiles = set()
+
+        if not self.dirty_rect.isEmpty():
+            self.update(self.dirty_rect)
+            self.dirty_rect = QRect()
+
+    def repaint_stats(self):
+        frame = self.canvas.width * self.canvas.height
+        return {
+            'repaints': self.repaint_count,
+            'pixels': self.repaint_area,
+            'frames': self.repaint_area / frame,
+        }
+
+    def reset_repaint_stats(self):
+        self.repaint_count = 0
+        self.repaint_area = 0
+
+    # прямоугольник, который занимает нарисованная граница (перо толщиной 3)
+    def border_rect(self):
+        if not len(self.border_points):
+            return QRect()
+        x0, y0 = self.border_points.min(axis=0)
+        x1, y1 = self.border_points.max(axis=0)
+        return QRect(int(x0), int(y0), int(x1 - x0) + 1, int(y1 - y0) + 1).adjusted(-2, -2, 2, 2)
+
+    # новая граница: упрощаем и один раз собираем путь; перерисовать надо и старую, и новую
+    def set_border(self, points):
+        damaged = self.border_rect()
+        self.border_points = points
+        self.border_path = QPainterPath()
+        kept = simplify(points, self.border_tolerance)
+        if len(kept) > 1:
+            self.border_path.moveTo(*kept[0])
+            for x, y in kept[1:]:
+                self.border_path.lineTo(x, y)
+        self.mark_dirty(damaged.united(self.border_rect()))
+
+    def set_border_tolerance(self, tolerance):
+        self.border_tolerance = tolerance
+        self.set_border(self.border_points)
+
+    # прямоугольник, описанный вокруг плиток keys
+    def tiles_rect(self, keys):
+        if not keys:
+            return QRect()
+        keys = np.array(list(keys))
+        y0, _, x0, _ = self.canvas.tile_rect(keys.min(axis=0))
+        _, y1, _, x1 = self.canvas.tile_rect(keys.max(axis=0))
+        return QRect(int(x0), int(y0), int(x1 - x0), int(y1 - y0))
+
+    # Плитки, которые может задеть отрезок штриха: берём точки отрезка через каждые TILE // 2
+    # пикселей и плитки вокруг каждой с запасом на толщину пера
+    def segment_tiles(self, p0, p1):
+        dx, dy = p1.x() - p0.x(), p1.y() - p0.y()
+        steps = max(abs(dx), abs(dy)) // (TILE // 2) + 1
+        margin = TILE // 4 + self.pen_width
+        keys = set()
+        for i in range(steps + 1):
+            x = p0.x() + dx * i // steps
+            y = p0.y() + dy * i // steps
+            keys.update(self.canvas.keys_in(y - margin, y + margin + 1, x - margin, x + margin + 1))
+        return keys
 
     def handle_click(self, point: QPoint):
         x, y = point.x(), point.y()
-        if not (0 <= x < self.image.width() and 0 <= y < self.image.height()):
+        if not (0 <= x < self.canvas.width and 0 <= y < self.canvas.height):
             return
 
         mode = self.main_window.mode
@@ -76,154 +224,93 @@ class DrawingWidget(QWidget):
         elif mode == "border":
             self.find_and_draw_border(x, y)
 
+    # отмена и повтор возвращают изменённые плитки
+    def undo(self):
+        self.restore_tiles(self.history.undo(self.canvas))
+
+    def redo(self):
+        self.restore_tiles(self.history.redo(self.canvas))
+
+    def restore_tiles(self, tiles):
+        if tiles is not None:
+            self.mark_dirty(self.tiles_rect(tiles))
+
     # заливка по линиям
     def flood_fill_line_by_line(self, x, y, fill_color):
-        if not (0 <= x < self.image.width() and 0 <= y < self.image.height()):
+        if not (0 <= x < self.canvas.width and 0 <= y < self.canvas.height):
             return
-        
-        target_color = QColor(self.image.pixel(x, y))
-        if target_color == self.border_color or target_color == fill_color:
+
+        border = self.border_color.rgb()
+        fill = fill_color.rgb()
+        target_color = self.canvas.pixel(x, y)
+        if target_color == border or target_color == fill:
             return
 
-        # получаем точки линии
-        line = []
-        left = x
-        while left >= 0:
-            c = QColor(self.image.pixel(left, y))
-            if c == self.border_color:
-                break
-            line.append(left)
-            left -= 1
-
-        right = x + 1
-        while right < self.image.width():
-            c = QColor(self.image.pixel(right, y))
-            if c == self.border_color:
-                break
-            line.append(right)
-            right += 1
-
-        # заливаем точки
-        for px in line:
-            self.image.setPixelColor(px, y, fill_color)
-
-        self.update()
-
-        for px in line:
-            self.flood_fill_line_by_line(px, y - 1, fill_color)
-            self.flood_fill_line_by_line(px, y + 1, fill_color)
+        # область берём из разметки: по плиткам, маской или плиткой целиком
+        masks = self.regions.region(x, y)
+        self.history.touch(self.canvas, masks)
+        for key, mask in masks.items():
+            if mask is None:
+                self.canvas.put(key, fill)
+            else:
+                tile = self.canvas.dense(key).copy()
+                tile[mask] = fill
+                self.canvas.put(key, tile)
+        self.history.commit(self.canvas)
+
+        self.mark_dirty(self.tiles_rect(masks))
 
     # заливка паттерном
     def flood_fill_with_pattern(self, x, y, pattern, origin):
         ox, oy = origin
         h, w = pattern.shape[:2]
 
-        if not (0 <= x < self.image.width() and 0 <= y < self.image.height()):
-            return
-
-        current_color = QColor(self.image.pixel(x, y))
-        if current_color == self.border_color:
+        if not (0 <= x < self.canvas.width and 0 <= y < self.canvas.height):
             return
 
-        # получаем цвет паттерна
-        px = (x - ox) % w
-        py = (y - oy) % h
-        pat_color = pattern[py, px]
-        pattern_qcolor = QColor(pat_color[0], pat_color[1], pat_color[2], pat_color[3] if len(pat_color) == 4 else 255)
-
-        if current_color == pattern_qcolor:
+        if self.canvas.pixel(x, y) == self.border_color.rgb():
             return
 
-        # получаем точки линии
-        line = []
-        left = x
-        while left >= 0:
-            c = QColor(self.image.pixel(left, y))
-            if c == self.border_color:
-                break
-            line.append(left)
-            left -= 1
-
-        right = x + 1
-        while right < self.image.width():
-            c = QColor(self.image.pixel(right, y))
-            if c == self.border_color:
-                break
-            line.append(right)
-            right += 1
-
-        # заливаем точки паттерном
-        for px_line in line:
-            px_pat = (px_line - ox) % w
-            py_pat = (y - oy) % h
-            pat_col = pattern[py_pat, px_pat]
-            qc = QColor(pat_col[0], pat_col[1], pat_col[2], pat_col[3] if len(pat_col) == 4 else 255)
-            self.image.setPixelColor(px_line, y, qc)
-
-        self.update()
-
-        for px_line in line:
-            self.flood_fill_with_pattern(px_line, y - 1, pattern, origin)
-            self.flood_fill_with_pattern(px_line, y + 1, pattern, origin)
+        masks = self.regions.region(x, y)
+        self.history.touch(self.canvas, masks)
+        for key, mask in masks.items():
+            y0, y1, x0, x1 = self.canvas.tile_rect(key)
+            # паттерн, размноженный от точки щелчка на плитку
+            tiled = pattern[np.ix_((np.arange(y0, y1) - oy) % h, (np.arange(x0, x1) - ox) % w)]
+            if tiled.shape[2] == 3:
+                alpha = np.ones(tiled.shape[:2] + (1,), dtype=np.float32)
+            else:
+                alpha = tiled[:, :, 3:].astype(np.float32) / 255
+
+            # байты пикселя RGB32 в памяти идут как B, G, R, A; полупрозрачный паттерн накладываем поверх
+            tile = self.canvas.dense(key).copy()
+            region = tile.view(np.uint8).reshape(y1 - y0, x1 - x0, 4)
+            blended = (tiled[:, :, 2::-1] * alpha + region[:, :, :3] * (1 - alpha)).astype(np.uint8)
+            if mask is None:
+                region[:, :, :3] = blended
+            else:
+                np.copyto(region[:, :, :3], blended, where=mask[:, :, np.newaxis])
+            self.canvas.put(key, tile)
+        self.history.commit(self.canvas)
+
+        self.mark_dirty(self.tiles_rect(masks))
 
     # обход и отрисовка границы
     def find_and_draw_border(self, start_x, start_y):
+        border = self.border_color.rgb()
         # ближайшая точка границы справа
-        x, y = start_x, start_y
-        while 0 <= x < self.image.width():
-            if QColor(self.image.pixel(x, y)) == self.border_color:
-                break
-            x += 1
-        else:
-            return  
-        
-        start_point = QPoint(x, y)
-        self.border_points = [start_point]
-
-        directions = [
-            (1, 0), # вправо
-            (1, -1), # вправо-вверх
-            (0, -1), # вверх
-            (-1, -1), # влево-вверх
-            (-1, 0), # влево
-            (-1, 1), # влево-вниз
-            (0, 1), # вниз
-            (1, 1) # вправо-вниз
-        ]
-
-        current = start_point
-        # обход начинаем вниз
-        prev_dir = 6
-
-        while True:
-            found = False
-            for i in range(8):
-                new_dir = (prev_dir - 2 + i) % 8
-                dx, dy = directions[new_dir]
-                nx, ny = current.x() + dx, current.y() + dy
-
-                if 0 <= nx < self.image.width() and 0 <= ny < self.image.height():
-                    if QColor(self.image.pixel(nx, ny)) == self.border_color:
-                        next_point = QPoint(nx, ny)
-
-                        if next_point == start_point and len(self.border_points) > 1:
-                            self.border_points.append(next_point)
-                            self.update()
-                            return
-                        
-                        self.border_points.append(next_point)
-                        current = next_point
-                        prev_dir = new_dir
-                        found = True
-                        break
-            if not found:
-                break
-
-        self.update()
+        x = find_right(self.canvas, start_x, start_y, border)
+        if x is None:
+            return
+
+        # коды соседей считаются только для плиток, через которые идёт обход
+        codes = CanvasCodes(self.canvas, border)
+        points = trace_moore(codes.at, x, start_y)
+        self.set_border(np.array(points, dtype=np.int64))
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, width=800, height=600):
         super().__init__()
         self.setGeometry(100, 100, 1000, 700)
 
@@ -258,6 +345,16 @@ class MainWindow(QMainWindow):
         self.btn_clear.clicked.connect(self.clear_canvas)
         control_layout.addWidget(self.btn_clear)
 
+        self.btn_undo = QPushButton("Отменить")
+        self.btn_undo.setShortcut(QKeySequence.StandardKey.Undo)
+        self.btn_undo.clicked.connect(lambda: self.drawing_widget.undo())
+        control_layout.addWidget(self.btn_undo)
+
+        self.btn_redo = QPushButton("Повторить")
+        self.btn_redo.setShortcut(QKeySequence.StandardKey.Redo)
+        self.btn_redo.clicked.connect(lambda: self.drawing_widget.redo())
+        control_layout.addWidget(self.btn_redo)
+
         self.btn_color = QPushButton("Цвет заливки")
         self.btn_color.clicked.connect(self.select_fill_color)
         control_layout.addWidget(self.btn_color)
@@ -266,13 +363,30 @@ class MainWindow(QMainWindow):
         self.btn_load_pattern.clicked.connect(self.load_pattern)
         control_layout.addWidget(self.btn_load_pattern)
 
-        self.drawing_widget = DrawingWidget(self)
-        layout.addWidget(self.drawing_widget)
+        # допуск упрощения границы в пикселях (0 - без упрощения)
+        control_layout.addWidget(QLabel("Упрощение:"))
+        self.tolerance_spin = QDoubleSpinBox()
+        self.tolerance_spin.setRange(0, 20)
+        self.tolerance_spin.setSingleStep(0.5)
+        self.tolerance_spin.setValue(1.0)
+        self.tolerance_spin.valueChanged.connect(lambda value: self.drawing_widget.set_border_tolerance(value))
+        control_layout.addWidget(self.tolerance_spin)
+
+        # холст может быть намного больше окна, поэтому он в области прокрутки
+        self.drawing_widget = DrawingWidget(self, width, height)
+        scroll_area = QScrollArea()
+        scroll_area.setWidget(self.drawing_widget)
+        layout.addWidget(scroll_area)
 
     def clear_canvas(self):
-        self.drawing_widget.image.fill(Qt.GlobalColor.white)
-        self.drawing_widget.border_points = []
-        self.drawing_widget.update()
+        # очистка - тоже действие: сохраняем только непустые плитки
+        widget = self.drawing_widget
+        keys = list(widget.canvas.tiles)
+        widget.history.touch(widget.canvas, keys)
+        widget.canvas.clear()
+        widget.history.commit(widget.canvas)
+        widget.mark_dirty(widget.tiles_rect(keys))
+        widget.set_border(np.zeros((0, 2), dtype=np.int64))
 
     def select_fill_color(self):
         color = QColorDialog.getColor()
@@ -295,6 +409,8 @@ class MainWindow(QMainWindow):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = MainWindow()
+    # размер холста можно задать: python task1.py 16384 16384
+    size = [int(arg) for arg in sys.argv[1:3]]
+    window = MainWindow(*size)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file